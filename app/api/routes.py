@@ -76,6 +76,20 @@ def invidious_diagnostics():
     return success_response(get_last_invidious_health(), message="获取 Invidious 最近健康状态成功")
 
 
+@api.route('/diagnostics/keywords')
+def keyword_diagnostics():
+    """搜索关键词命中统计（按命中率升序，便于找出浪费配额的关键词模式）"""
+    anime_id = request.args.get('anime_id', type=int)
+    limit = min(max(request.args.get('limit', 200, type=int), 1), 1000)
+    return success_response(db.list_keyword_stats(anime_id, limit), message="获取关键词统计成功")
+
+
+@api.route('/diagnostics/sync_queue')
+def sync_queue_diagnostics():
+    """同步队列各优先级排队中的任务数"""
+    return success_response({'queued': sync_queue.queue_depths()}, message="获取同步队列状态成功")
+
+
 # ==================== 搜索 ====================
 
 @api.route('/search')
@@ -15,6 +15,21 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 TZ = os.getenv("TZ", "Asia/Shanghai")
 METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# 单写线程：同步路径上的写操作（视频源、健康状态、同步日志等）排队交给一个线程，
+# 每 DB_WRITE_BATCH_MS 毫秒内到达的写操作合并成一个事务，避免多线程争抢 SQLite 写锁
+DB_WRITER_ENABLED = os.getenv("DB_WRITER_ENABLED", "true").lower() == "true"
+DB_WRITE_QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", "1000"))
+DB_WRITE_BATCH_MS = int(os.getenv("DB_WRITE_BATCH_MS", "5"))
+DB_WRITE_BATCH_MAX = int(os.getenv("DB_WRITE_BATCH_MAX", "200"))
+# 等待写线程完成一个写操作的最长秒数，超时视为写入失败，避免写线程卡死时调用方永久阻塞
+DB_WRITE_TIMEOUT = float(os.getenv("DB_WRITE_TIMEOUT", "30"))
+# 连接池：常驻连接数（0 表示按 SYNC_QUEUE_WORKERS × EPISODE_SYNC_WORKERS + 4 自动计算，
+# 不超过 DB_POOL_MAX_SIZE；连接按需创建），
+# 连接用尽时的等待秒数（超时后临时新建连接），以及每个连接缓存的预编译语句数
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "32"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_CACHED_STATEMENTS = int(os.getenv("DB_CACHED_STATEMENTS", "256"))
 
 # SECRET_KEY: 优先从环境变量获取；未设置时持久化到 data 目录复用，
 # 避免每次重启都换新 key 导致所有用户会话失效。
@@ -68,18 +83,53 @@ INVIDIOUS_FALLBACK_URLS = [
 ]
 INVIDIOUS_PRIMARY_WEIGHT = int(os.getenv("INVIDIOUS_PRIMARY_WEIGHT", "7"))
 INVIDIOUS_FALLBACK_WEIGHT = int(os.getenv("INVIDIOUS_FALLBACK_WEIGHT", "3"))
+# 每个实例的请求速率上限（令牌桶：每秒补充数 / 最多积攒数），多部动漫并发同步时共享；0 表示不限速
+INVIDIOUS_RATE_PER_SECOND = float(os.getenv("INVIDIOUS_RATE_PER_SECOND", "5"))
+INVIDIOUS_RATE_BURST = int(os.getenv("INVIDIOUS_RATE_BURST", "10"))
 
 # ==================== 匹配算法参数 ====================
 MATCH_THRESHOLD = int(os.getenv("MATCH_THRESHOLD", "50"))
 MATCH_RECOMMEND_THRESHOLD = int(os.getenv("MATCH_RECOMMEND_THRESHOLD", "70"))
 MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "50"))
 SEARCH_KEYWORDS_LIMIT = int(os.getenv("SEARCH_KEYWORDS_LIMIT", "5"))
+# 关键词按历史命中率排序后分批搜索：每批关键词数，以及凑够多少个 S/A 级视频源即停止后续批次
+KEYWORD_WAVE_SIZE = int(os.getenv("KEYWORD_WAVE_SIZE", "2"))
+KEYWORD_TIER_TARGET = int(os.getenv("KEYWORD_TIER_TARGET", "3"))
+# 某关键词模式已搜索 N 次仍未产出被采纳的视频源时暂不再搜索，M 天后重新尝试一次
+KEYWORD_PRUNE_MIN_ATTEMPTS = int(os.getenv("KEYWORD_PRUNE_MIN_ATTEMPTS", "4"))
+KEYWORD_PRUNE_RETRY_DAYS = int(os.getenv("KEYWORD_PRUNE_RETRY_DAYS", "14"))
+# 单个关键词最多翻几页（每页约 20 条），以及同时预取的页数
+SEARCH_MAX_PAGES = int(os.getenv("SEARCH_MAX_PAGES", "3"))
+SEARCH_PAGE_CONCURRENCY = int(os.getenv("SEARCH_PAGE_CONCURRENCY", "2"))
 SOURCE_SEARCH_WORKERS = int(os.getenv("SOURCE_SEARCH_WORKERS", "6"))
 EPISODE_SYNC_WORKERS = int(os.getenv("EPISODE_SYNC_WORKERS", "6"))
 FUZZY_EDIT_DISTANCE_MAX = int(os.getenv("FUZZY_EDIT_DISTANCE_MAX", "2"))
 FUZZY_NGRAM_SIZE = int(os.getenv("FUZZY_NGRAM_SIZE", "2"))
 FUZZY_MIN_SIMILARITY = float(os.getenv("FUZZY_MIN_SIMILARITY", "0.6"))
 COLLECTION_MAX_DURATION = int(os.getenv("COLLECTION_MAX_DURATION", "3600"))
+# 剧集级搜索：一次同步待搜集数达到该值时，先按名称/别名搜索并按集数分发，空集再逐集搜索（0 表示关闭）
+SHOW_HARVEST_MIN_EPISODES = int(os.getenv("SHOW_HARVEST_MIN_EPISODES", "3"))
+SHOW_HARVEST_NAMES_LIMIT = int(os.getenv("SHOW_HARVEST_NAMES_LIMIT", "3"))
+SHOW_HARVEST_PAGES = int(os.getenv("SHOW_HARVEST_PAGES", "3"))
+# 文本归一化 LRU 缓存容量（按原始字符串缓存，0 表示不缓存）
+NORMALIZE_CACHE_SIZE = int(os.getenv("NORMALIZE_CACHE_SIZE", "20000"))
+
+# 设置快照的兜底重载间隔（秒）；set_setting 会立即更新快照，此值只用于感知外部直接改库
+SETTINGS_CACHE_TTL = int(os.getenv("SETTINGS_CACHE_TTL", "60"))
+
+# ==================== 搜索结果缓存 ====================
+# Invidious 搜索结果按 (查询, 排序, 页码) 落库缓存，减少被实例限流
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+# 播出不久的集数搜索结果变化快用短 TTL，早已播出的用长 TTL（秒）
+SEARCH_CACHE_TTL_RECENT = int(os.getenv("SEARCH_CACHE_TTL_RECENT", "1800"))
+SEARCH_CACHE_TTL_OLD = int(os.getenv("SEARCH_CACHE_TTL_OLD", "604800"))
+SEARCH_CACHE_RECENT_DAYS = int(os.getenv("SEARCH_CACHE_RECENT_DAYS", "14"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_MB", "64")) * 1024 * 1024
+# 每写入多少条缓存做一次淘汰
+SEARCH_CACHE_PRUNE_EVERY = int(os.getenv("SEARCH_CACHE_PRUNE_EVERY", "200"))
+# 命中缓存时最近访问时间的刷新精度（秒）：距上次刷新不足该时长时不写库，淘汰顺序只需要粗略时间
+SEARCH_CACHE_TOUCH_SECONDS = int(os.getenv("SEARCH_CACHE_TOUCH_SECONDS", "300"))
 
 # ==================== 评分权重 ====================
 SCORE_WEIGHT_TITLE = 0.40
@@ -127,6 +177,27 @@ EXCLUDE_KEYWORDS: list[str] = [
 SOURCE_CACHE_DAYS = 7
 SYNC_LOG_KEEP_DAYS = 90
 SYNC_TASK_RETENTION_SECONDS = int(os.getenv("SYNC_TASK_RETENTION_SECONDS", "3600"))
+# 同步队列同时执行的动漫数
+SYNC_QUEUE_WORKERS = int(os.getenv("SYNC_QUEUE_WORKERS", "3"))
+# 同步队列优先级老化：每降一个优先级等价于晚入队这么多秒，低优先级任务等待足够久后会排到高优先级前面
+SYNC_QUEUE_AGING_SECONDS = int(os.getenv("SYNC_QUEUE_AGING_SECONDS", "1800"))
+# 同步任务日志：入队、开始、逐集断点和结束写入 SQLite，重启后未完成的任务从断点继续
+SYNC_TASK_JOURNAL_ENABLED = os.getenv("SYNC_TASK_JOURNAL_ENABLED", "false").lower() == "true"
+# 最近多少小时内有新集开播的动漫，自动同步时优先执行
+SYNC_FRESH_AIRED_HOURS = int(os.getenv("SYNC_FRESH_AIRED_HOURS", "48"))
+# 自动同步调度模式：interval 按各动漫 sync_interval（0 表示用 auto_sync_interval）到期同步；
+# calendar 按各动漫开播日历定点轮询
+SYNC_SCHEDULE_MODE = os.getenv("SYNC_SCHEDULE_MODE", "interval").lower()
+# interval 模式两次唤醒的最长间隔（分钟），保证新添加的动漫和改动的同步间隔及时生效
+AUTO_SYNC_MAX_SLEEP_MINUTES = int(os.getenv("AUTO_SYNC_MAX_SLEEP_MINUTES", "60"))
+# calendar 模式：检查间隔；预计开播时间 = 开播日 0 点 + 偏移小时；开播后按「已过时长的一半」退避轮询，
+# 间隔介于最小/最大值之间；开播超过 ACTIVE_DAYS 仍无新源或无可推算开播日的动漫，按 IDLE_HOURS 低频轮询
+SYNC_CALENDAR_TICK_MINUTES = int(os.getenv("SYNC_CALENDAR_TICK_MINUTES", "15"))
+SYNC_CALENDAR_RELEASE_OFFSET_HOURS = float(os.getenv("SYNC_CALENDAR_RELEASE_OFFSET_HOURS", "10"))
+SYNC_CALENDAR_MIN_POLL_MINUTES = int(os.getenv("SYNC_CALENDAR_MIN_POLL_MINUTES", "60"))
+SYNC_CALENDAR_MAX_POLL_HOURS = int(os.getenv("SYNC_CALENDAR_MAX_POLL_HOURS", "24"))
+SYNC_CALENDAR_ACTIVE_DAYS = int(os.getenv("SYNC_CALENDAR_ACTIVE_DAYS", "14"))
+SYNC_CALENDAR_IDLE_HOURS = int(os.getenv("SYNC_CALENDAR_IDLE_HOURS", "72"))
 DISCOVER_TMDB_LATEST_EPISODES = os.getenv("DISCOVER_TMDB_LATEST_EPISODES", "false").lower() == "true"
 
 # ==================== Telegram 推送 ====================
@@ -0,0 +1,123 @@
+"""
+追漫阁 - 开播日历调度
+
+calendar 模式下，根据各动漫已记录的开播日期推算下一集的预计开播时间，
+只在开播后的窗口内按退避间隔轮询；没有新集可等的动漫低频轮询。
+"""
+import statistics
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from app import config
+
+# 推算播出周期时接受的间隔范围（天）；超出范围视为不规律，不做推算
+_MIN_CADENCE_DAYS = 1
+_MAX_CADENCE_DAYS = 31
+
+
+def _parse_date(value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def infer_next_release(recent_air_dates: list[str], next_air_date: str = "") -> Optional[date]:
+    """
+    推算下一集的开播日期
+
+    TMDB 已登记下一集时直接使用；否则取最近几集开播间隔的中位数作为播出周期，
+    从最近一集往后推一个周期。
+
+    Args:
+        recent_air_dates: 最近已开播集数的开播日期（降序，YYYY-MM-DD）
+        next_air_date: TMDB 已登记的下一集开播日期
+
+    Returns:
+        预计开播日期，无法推算时返回 None
+    """
+    scheduled = _parse_date(next_air_date) if next_air_date else None
+    if scheduled:
+        return scheduled
+
+    dates = [parsed for parsed in map(_parse_date, recent_air_dates) if parsed]
+    if len(dates) < 2:
+        return None
+    gaps = [(newer - older).days for newer, older in zip(dates, dates[1:])]
+    cadence = statistics.median(gaps)
+    if not _MIN_CADENCE_DAYS <= cadence <= _MAX_CADENCE_DAYS:
+        return None
+    return dates[0] + timedelta(days=round(cadence))
+
+
+def release_time(air_date: date) -> datetime:
+    """开播日对应的预计上线时间（本地时间）"""
+    return datetime.combine(air_date, datetime.min.time()) + timedelta(
+        hours=config.SYNC_CALENDAR_RELEASE_OFFSET_HOURS
+    )
+
+
+def _backoff_hours(elapsed_hours: float) -> float:
+    """开播后的轮询间隔：已过时长的一半，限制在最小/最大轮询间隔之间"""
+    return min(
+        max(elapsed_hours / 2, config.SYNC_CALENDAR_MIN_POLL_MINUTES / 60),
+        config.SYNC_CALENDAR_MAX_POLL_HOURS,
+    )
+
+
+def calendar_sync_due(
+    anime: dict,
+    plan: Optional[dict],
+    recent_air_dates: list[str],
+    now: datetime,
+    interval_hours: float,
+) -> tuple[bool, str]:
+    """
+    calendar 模式下判断动漫此刻是否需要同步
+
+    有缺源集数时以最近一集的开播时间为锚点，否则以推算的下一集开播时间为锚点；
+    锚点之后尚未同步过则立即同步，之后按已过时长的一半退避，
+    超过 SYNC_CALENDAR_ACTIVE_DAYS 仍无结果转为低频轮询。
+
+    Args:
+        anime: 动漫信息
+        plan: db.get_library_sync_plan 中该动漫的条目
+        recent_air_dates: db.get_recent_air_dates 中该动漫的条目
+        now: 当前本地时间
+        interval_hours: 全局同步间隔（手动添加的动漫没有开播日期，仍按此间隔搜索新集）
+
+    Returns:
+        是否需要同步和原因
+    """
+    if plan is None:
+        return True, "unplanned"
+    hours_since_sync = plan["hours_since_sync"]
+    if hours_since_sync is None:
+        return True, "never_synced"
+
+    if anime.get("tmdb_id") is None:
+        return hours_since_sync >= interval_hours, "discover"
+
+    idle_hours = config.SYNC_CALENDAR_IDLE_HOURS
+    latest_aired = _parse_date(plan["latest_air_date"])
+    if plan["missing_count"] > 0 and latest_aired:
+        anchor = release_time(latest_aired)
+        reason = "missing"
+    else:
+        if anime.get("status") in ("Ended", "Canceled"):
+            return False, "complete"
+        next_release = infer_next_release(recent_air_dates, plan["next_air_date"])
+        if next_release is None:
+            return hours_since_sync >= idle_hours, "idle"
+        anchor = release_time(next_release)
+        if anchor > now:
+            # 下一集尚未开播，只做低频兜底刷新
+            return hours_since_sync >= idle_hours, "waiting"
+        reason = "released"
+
+    elapsed_hours = (now - anchor).total_seconds() / 3600
+    if elapsed_hours > config.SYNC_CALENDAR_ACTIVE_DAYS * 24:
+        return hours_since_sync >= idle_hours, "idle"
+    if hours_since_sync > elapsed_hours:
+        return True, reason
+    return hours_since_sync >= _backoff_hours(elapsed_hours), reason
@@ -0,0 +1,74 @@
+"""
+追漫阁 - 候选视频记录
+
+搜索结果从 Invidious 解析后到写入数据库之前，全程以 VideoCandidate 传递，
+只在数据库/API 边界转换为字典。
+"""
+import json
+import zlib
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(slots=True)
+class VideoCandidate:
+    """一条搜索结果及其评分结果；sort_key 在评分时预先算好，排序不再逐项取字段。"""
+    video_id: str
+    title: str = ""
+    channel_id: str = ""
+    channel_name: str = ""
+    duration: int = 0
+    view_count: int = 0
+    published_at: str = ""
+    published_timestamp: int = 0
+    # 以下字段由 score_videos 填写
+    match_score: float = 0.0
+    confidence_tier: str = ""
+    sort_key: tuple = ()
+
+    @classmethod
+    def from_invidious(cls, item: dict) -> "VideoCandidate":
+        """从 Invidious /api/v1/search 的单条结果构建"""
+        return cls(
+            video_id=item.get("videoId", ""),
+            title=item.get("title", ""),
+            channel_id=item.get("authorId", ""),
+            channel_name=item.get("author", ""),
+            duration=item.get("lengthSeconds", 0),
+            view_count=item.get("viewCount", 0),
+            published_at=item.get("publishedText", ""),
+            published_timestamp=item.get("published", 0),
+        )
+
+    def to_source_record(self, episode_id: int) -> dict[str, Any]:
+        """转换为 db.add_source / db.replace_episode_sources 所需的视频源记录"""
+        return {
+            "episode_id": episode_id,
+            "video_id": self.video_id,
+            "title": self.title,
+            "channel_id": self.channel_id,
+            "channel_name": self.channel_name,
+            "duration": self.duration,
+            "view_count": self.view_count,
+            "published_at": self.published_at,
+            "match_score": self.match_score,
+        }
+
+
+# 搜索结果缓存只保存 Invidious 解析出的字段，评分字段每次重新计算
+_SEARCH_FIELDS = (
+    "video_id", "title", "channel_id", "channel_name",
+    "duration", "view_count", "published_at", "published_timestamp",
+)
+
+
+def encode_candidates(videos: list[VideoCandidate]) -> bytes:
+    """把候选视频序列化为压缩 JSON（搜索结果缓存用）"""
+    rows = [[getattr(video, field) for field in _SEARCH_FIELDS] for video in videos]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_candidates(payload: bytes) -> list[VideoCandidate]:
+    """encode_candidates 的逆操作"""
+    rows = json.loads(zlib.decompress(payload).decode("utf-8"))
+    return [VideoCandidate(*row) for row in rows]
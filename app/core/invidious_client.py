@@ -3,14 +3,49 @@
 """
 import json
 import logging
+import math
 import threading
-from typing import Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
 import requests
 from requests.adapters import HTTPAdapter
 from app import config
+from app.core.candidate import VideoCandidate, decode_candidates, encode_candidates
+from app.core.metrics import INVIDIOUS_THROTTLE_SECONDS, SEARCH_CACHE_REQUESTS
 
 logger = logging.getLogger(__name__)
 
+# Invidious /api/v1/search 每页大约返回的视频数，用于按结果预算估算页数
+SEARCH_PAGE_SIZE = 20
+
+# 影响实例列表与权重的设置键；只有这些键变化时才重新加载实例配置
+INSTANCE_SETTING_KEYS = frozenset({"invidious_url", "invidious_fallback_urls", "invidious_instance_weights"})
+
+
+class TokenBucket:
+    """令牌桶：每秒匀速补充 rate 个令牌，最多积攒 burst 个；令牌不足时 acquire 阻塞等待"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取一个令牌，返回等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 先预占令牌再睡眠，并发请求按到达顺序排队，不会同时醒来抢同一个令牌
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
 
 class InvidiousClient:
     """Invidious API 客户端，支持用户配置实例与权重负载均衡"""
@@ -25,10 +60,15 @@ class InvidiousClient:
         self.session.mount("https://", adapter)
         self._lb_index = 0
         self._lb_lock = threading.Lock()
+        self._cache_writes = 0
+        self._cache_lock = threading.Lock()
+        self._rate_buckets: dict[str, TokenBucket] = {}
+        self._rate_lock = threading.Lock()
         self.primary_url = self._load_primary_url()
         self.fallback_urls = self._load_fallback_urls(self.primary_url)
         self.instance_weights = self._load_instance_weights()
         self.current_url = self.primary_url
+        self._instances_stale = False
         logger.info(f"Invidious 客户端初始化，当前实例: {self.current_url}")
 
     def update_url(self, new_url: str):
@@ -53,8 +93,21 @@ class InvidiousClient:
             logger.error(f"Invidious 连接测试失败: {self.current_url} → {e}")
             return False
 
+    def mark_instances_stale(self) -> None:
+        """实例相关设置已变更，下次 refresh_instances 时重新加载"""
+        self._instances_stale = True
+
     def refresh_instances(self) -> None:
-        """从设置重新加载主实例、备用实例及其权重"""
+        """实例相关设置变更后，从设置重新加载主实例、备用实例及其权重；未变更时直接返回"""
+        try:
+            from app.db import database as db
+            # 触发设置快照的 TTL 兜底重载；外部直接改库时会经变更通知标记实例配置过期
+            db.get_settings_version()
+        except Exception as e:
+            logger.warning(f"读取设置版本失败: {e}")
+        if not self._instances_stale:
+            return
+        self._instances_stale = False
         primary_url = self._load_primary_url()
         fallback_urls = self._load_fallback_urls(primary_url)
         if primary_url != self.primary_url or fallback_urls != self.fallback_urls:
@@ -155,6 +208,7 @@ class InvidiousClient:
         while True:
             url = f"{candidate}{endpoint}"
             tried.add(candidate)
+            self._throttle(candidate)
             try:
                 logger.debug(f"Invidious 请求: {url}")
                 resp = self.session.get(url, params=params or {}, timeout=self.timeout)
@@ -174,50 +228,197 @@ class InvidiousClient:
             raise last_error
         raise requests.RequestException("无可用 Invidious 实例")
 
-    def search_videos(self, query: str, max_results: int = 20, sort_by: str = "relevance") -> list[dict]:
+    def _throttle(self, instance_url: str) -> None:
+        """按实例限速；同一进程内所有同步任务共享各实例的令牌桶"""
+        if config.INVIDIOUS_RATE_PER_SECOND <= 0:
+            return
+        bucket = self._rate_buckets.get(instance_url)
+        if bucket is None:
+            with self._rate_lock:
+                bucket = self._rate_buckets.setdefault(
+                    instance_url,
+                    TokenBucket(config.INVIDIOUS_RATE_PER_SECOND, config.INVIDIOUS_RATE_BURST),
+                )
+        waited = bucket.acquire()
+        if waited > 0:
+            INVIDIOUS_THROTTLE_SECONDS.inc(waited)
+
+    def search_videos(
+        self,
+        query: str,
+        max_results: Optional[int] = 20,
+        sort_by: str = "relevance",
+        page: int = 1,
+        cache_ttl: Optional[int] = None,
+        refresh_cache: bool = False,
+    ) -> list[VideoCandidate]:
         """
-        搜索视频
+        搜索单页视频（结果按查询/排序/页码落库缓存）
 
         Args:
             query: 搜索关键词
-            max_results: 最大结果数
+            max_results: 最大结果数，None 表示整页返回
             sort_by: 排序方式 (relevance, date, view_count, rating)
+            page: 结果页码（从 1 开始）
+            cache_ttl: 缓存有效期（秒），默认 SEARCH_CACHE_TTL_RECENT，0 表示不使用缓存
+            refresh_cache: 跳过缓存读取直接请求实例，并用新结果覆盖缓存（强制同步用）
 
         Returns:
-            视频列表
+            候选视频列表
         """
+        if cache_ttl is None:
+            cache_ttl = config.SEARCH_CACHE_TTL_RECENT
+        use_cache = config.SEARCH_CACHE_ENABLED and cache_ttl > 0
+        cache_key = _search_cache_key(query)
+
+        if use_cache and not refresh_cache:
+            cached = self._read_search_cache(cache_key, sort_by, page)
+            if cached is not None:
+                SEARCH_CACHE_REQUESTS.labels(result="hit").inc()
+                logger.info(f"搜索缓存命中: '{query}' 第{page}页 → {len(cached)} 个视频")
+                return cached[:max_results]
+            SEARCH_CACHE_REQUESTS.labels(result="miss").inc()
+        elif use_cache:
+            SEARCH_CACHE_REQUESTS.labels(result="bypass").inc()
+
         try:
             results = self._request("/api/v1/search", {
                 "q": query,
                 "type": "video",
                 "sort_by": sort_by,
+                "page": page,
             })
-            logger.info(f"搜索视频: '{query}' (实例: {self.current_url})")
+            logger.info(f"搜索视频: '{query}' 第{page}页 (实例: {self.current_url})")
 
             if not isinstance(results, list):
                 logger.warning(f"Invidious 返回非列表结果: {type(results)} → {str(results)[:200]}")
                 return []
 
-            videos = []
-            for item in results[:max_results]:
-                if item.get("type") != "video":
-                    continue
-                videos.append({
-                    "video_id": item.get("videoId", ""),
-                    "title": item.get("title", ""),
-                    "channel_id": item.get("authorId", ""),
-                    "channel_name": item.get("author", ""),
-                    "duration": item.get("lengthSeconds", 0),
-                    "view_count": item.get("viewCount", 0),
-                    "published_at": item.get("publishedText", ""),
-                    "published_timestamp": item.get("published", 0),
-                })
+            videos = [
+                VideoCandidate.from_invidious(item)
+                for item in results
+                if item.get("type") == "video"
+            ]
             logger.info(f"搜索完成: '{query}' → {len(videos)} 个视频")
-            return videos
         except Exception as e:
             logger.error(f"视频搜索失败: {query} - {type(e).__name__}: {e}")
             return []
 
+        # 只缓存成功的响应；缓存整页结果，不同 max_results 的调用共用
+        if use_cache:
+            self._write_search_cache(cache_key, sort_by, page, videos, cache_ttl)
+        return videos[:max_results]
+
+    def iter_search_pages(
+        self,
+        query: str,
+        sort_by: str = "relevance",
+        max_pages: Optional[int] = None,
+        cache_ttl: Optional[int] = None,
+        refresh_cache: bool = False,
+    ) -> Iterator[list[VideoCandidate]]:
+        """
+        分页流式搜索：并发预取后续页面，按页码顺序逐页产出，遇到空页即结束
+
+        每页是一次独立请求，经 _request 按权重轮询分摊到各实例。
+        调用方提前停止迭代时不再提交新页面，未开始的预取会被取消。
+
+        Args:
+            query: 搜索关键词
+            sort_by: 排序方式
+            max_pages: 最多翻页数，默认 SEARCH_MAX_PAGES
+            cache_ttl: 缓存有效期（秒）
+            refresh_cache: 跳过缓存读取
+        """
+        max_pages = max(1, max_pages or config.SEARCH_MAX_PAGES)
+        concurrency = max(1, min(config.SEARCH_PAGE_CONCURRENCY, max_pages))
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        pending = {}
+        next_page = 1
+        try:
+            for page in range(1, max_pages + 1):
+                while next_page <= max_pages and len(pending) < concurrency:
+                    pending[next_page] = executor.submit(
+                        self.search_videos, query, None, sort_by, next_page, cache_ttl, refresh_cache
+                    )
+                    next_page += 1
+                videos = pending.pop(page).result()
+                if not videos:
+                    return
+                yield videos
+        finally:
+            for future in pending.values():
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def search_videos_deep(
+        self,
+        query: str,
+        max_results: int = 50,
+        sort_by: str = "relevance",
+        cache_ttl: Optional[int] = None,
+        refresh_cache: bool = False,
+        stop_when: Optional[Callable[[list[VideoCandidate]], bool]] = None,
+        max_pages: Optional[int] = None,
+    ) -> list[VideoCandidate]:
+        """
+        多页搜索，直到凑满 max_results、结果翻完或 stop_when 判定已足够
+
+        Args:
+            query: 搜索关键词
+            max_results: 结果预算
+            sort_by: 排序方式
+            cache_ttl: 缓存有效期（秒）
+            refresh_cache: 跳过缓存读取
+            stop_when: 每取到一页调用一次（传入该页新增的视频），返回 True 时不再翻页
+            max_pages: 最多翻页数，默认按结果预算估算且不超过 SEARCH_MAX_PAGES
+
+        Returns:
+            按页码顺序、去重后的候选视频列表
+        """
+        if max_pages is None:
+            max_pages = min(config.SEARCH_MAX_PAGES, math.ceil(max_results / SEARCH_PAGE_SIZE))
+        videos: list[VideoCandidate] = []
+        seen_ids = set()
+        pages = self.iter_search_pages(query, sort_by, max_pages, cache_ttl, refresh_cache)
+        try:
+            for page_videos in pages:
+                fresh = []
+                for video in page_videos:
+                    if video.video_id not in seen_ids:
+                        seen_ids.add(video.video_id)
+                        fresh.append(video)
+                videos.extend(fresh)
+                if len(videos) >= max_results or (stop_when and stop_when(fresh)):
+                    break
+        finally:
+            pages.close()
+        return videos[:max_results]
+
+    @staticmethod
+    def _read_search_cache(cache_key: str, sort_by: str, page: int) -> Optional[list[VideoCandidate]]:
+        try:
+            from app.db import database as db
+            payload = db.get_search_cache(cache_key, sort_by, page)
+            return decode_candidates(payload) if payload is not None else None
+        except Exception as e:
+            logger.warning(f"读取搜索缓存失败: {e}")
+            return None
+
+    def _write_search_cache(
+        self, cache_key: str, sort_by: str, page: int, videos: list[VideoCandidate], ttl: int
+    ) -> None:
+        try:
+            from app.db import database as db
+            db.set_search_cache(cache_key, sort_by, page, encode_candidates(videos), ttl)
+            with self._cache_lock:
+                self._cache_writes += 1
+                should_prune = self._cache_writes % max(1, config.SEARCH_CACHE_PRUNE_EVERY) == 0
+            if should_prune:
+                prune_search_cache()
+        except Exception as e:
+            logger.warning(f"写入搜索缓存失败: {e}")
+
     def get_video_info(self, video_id: str) -> Optional[dict]:
         """
         获取视频详情
@@ -345,6 +546,20 @@ def _parse_fallback_urls(raw_value: Any) -> list[str]:
     return [item.strip() for item in raw_text.replace("\n", ",").split(",") if item.strip()]
 
 
+def _search_cache_key(query: str) -> str:
+    """搜索缓存键：只归一化空白和大小写，不改变查询语义"""
+    return " ".join(query.split()).lower()
+
+
+def prune_search_cache() -> int:
+    """按配置的条数/容量上限淘汰搜索结果缓存"""
+    from app.db import database as db
+    deleted = db.prune_search_cache(config.SEARCH_CACHE_MAX_ENTRIES, config.SEARCH_CACHE_MAX_BYTES)
+    if deleted:
+        logger.info(f"搜索缓存淘汰 {deleted} 条")
+    return deleted
+
+
 def _normalize_url(url: str) -> str:
     """规范化实例地址"""
     return str(url or "").strip().rstrip("/")
@@ -377,6 +592,7 @@ def _parse_instance_weights(raw_value: Any) -> dict[str, int]:
 
 
 _invidious_client_instance: Optional["InvidiousClient"] = None
+_settings_listener_registered = False
 
 
 def get_invidious_client() -> "InvidiousClient":
@@ -385,12 +601,26 @@ def get_invidious_client() -> "InvidiousClient":
     Returns:
         InvidiousClient 实例
     """
-    global _invidious_client_instance
+    global _invidious_client_instance, _settings_listener_registered
     if _invidious_client_instance is None:
         _invidious_client_instance = InvidiousClient()
+    if not _settings_listener_registered:
+        try:
+            from app.db import database as db
+            db.add_settings_listener(_on_settings_changed)
+            _settings_listener_registered = True
+        except Exception as e:
+            logger.warning(f"注册设置变更监听失败: {e}")
     return _invidious_client_instance
 
 
+def _on_settings_changed(keys: set[str]) -> None:
+    """设置变更通知：实例相关设置变化时标记当前客户端的实例配置过期"""
+    client = _invidious_client_instance
+    if client is not None and keys & INSTANCE_SETTING_KEYS:
+        client.mark_instances_stale()
+
+
 def reset_invidious_client() -> None:
     """重置 Invidious 客户端实例（仅用于测试或配置更新）"""
     global _invidious_client_instance
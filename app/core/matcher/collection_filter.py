@@ -3,7 +3,9 @@
 """
 import re
 import logging
+from typing import NamedTuple, Optional
 from app import config
+from app.core.matcher.preprocessor import TitleNumbers, parse_title_numbers
 
 logger = logging.getLogger(__name__)
 
@@ -38,71 +40,195 @@ AUDIO_STORY_KEYWORDS = [
     '广播剧', '书场', '评书',
 ]
 
-# 合集标题模式
-COLLECTION_RANGE_PATTERN = re.compile(
-    r'(\d+)\s*[-~～到至]\s*(\d+)\s*[集话話期回]'
-)
-COLLECTION_ALL_PATTERN = re.compile(
-    r'[全共]\s*(\d+)\s*[集话話期回]'
-)
+# 非正片关键词分类（顺序即优先级）
+NON_EPISODE_KEYWORD_GROUPS = [
+    ("剪辑", CLIP_KEYWORDS),
+    ("解说", COMMENTARY_KEYWORDS),
+    ("预告", PREVIEW_KEYWORDS),
+    ("音乐", MUSIC_KEYWORDS),
+    ("有声小说", AUDIO_STORY_KEYWORDS),
+]
 
+_NON_EPISODE_CATEGORY_RANK = {
+    category: index for index, (category, _) in enumerate(NON_EPISODE_KEYWORD_GROUPS)
+}
 
-def is_collection(title: str, duration: int = 0) -> bool:
-    """
-    检测是否为合集视频
+COLLECTION_CATEGORY = "合集"
+EXCLUDE_CATEGORY = "排除"
 
-    改进：增加上下文判断，避免误过滤
-    - 标题同时包含具体集数（如"第5集"）时不过滤
-    - 仅当"合集"附近有范围词才过滤
+# 同时带具体集数时放行的合集关键词（可能只是频道名/栏目名）
+COLLECTION_SOFT_KEYWORDS = frozenset({'合集', '大合集', '合辑'})
 
-    Args:
-        title: 视频标题
-        duration: 视频时长（秒）
+class KeywordHit(NamedTuple):
+    """关键词命中：分类与原始关键词。"""
+    category: str
+    keyword: str
 
-    Returns:
-        是否为合集
+
+class FilterHit(NamedTuple):
+    """过滤命中原因。"""
+    category: str
+    keyword: str
+
+    @property
+    def reason(self) -> str:
+        return f"合集/非正片内容：{self.category}「{self.keyword}」"
+
+
+class KeywordMatcher:
+    """
+    多模式关键词匹配器
+
+    把所有分类的关键词编译成一个前瞻交替正则，对小写标题做一次线性扫描，
+    即可得到每个位置上命中的全部关键词及其分类，替代逐个关键词的子串查找。
     """
-    title_lower = title.lower()
 
+    def __init__(self, groups: list[tuple[str, list[str]]]):
+        self._hits_by_keyword: dict[str, list[KeywordHit]] = {}
+        for category, keywords in groups:
+            for keyword in keywords:
+                key = keyword.lower()
+                if not key:
+                    continue
+                hits = self._hits_by_keyword.setdefault(key, [])
+                hit = KeywordHit(category, keyword)
+                if hit not in hits:
+                    hits.append(hit)
+
+        keys = sorted(self._hits_by_keyword, key=len, reverse=True)
+        # 同一起点只能命中最长的关键词，这里补上作为其前缀的短关键词（如 react / reaction）
+        self._prefixes: dict[str, list[str]] = {
+            key: [other for other in keys if other != key and key.startswith(other)]
+            for key in keys
+        }
+        self._pattern: Optional[re.Pattern] = None
+        if keys:
+            self._pattern = re.compile(
+                "(?=(" + "|".join(re.escape(key) for key in keys) + "))"
+            )
+
+    def find_all(self, text: str) -> list[KeywordHit]:
+        """
+        返回文本中命中的全部关键词（按出现位置排序，已去重）
+
+        Args:
+            text: 待匹配文本（调用方无需预先转小写）
+        """
+        if self._pattern is None or not text:
+            return []
+        found: list[KeywordHit] = []
+        seen_keys = set()
+        for match in self._pattern.finditer(text.lower()):
+            key = match.group(1)
+            for item in (key, *self._prefixes[key]):
+                if item in seen_keys:
+                    continue
+                seen_keys.add(item)
+                found.extend(self._hits_by_keyword[item])
+        return found
+
+
+_keyword_matcher: Optional[KeywordMatcher] = None
+_keyword_matcher_exclude: tuple[str, ...] = ()
+
+
+def reload_keyword_matcher() -> KeywordMatcher:
+    """按当前关键词配置重建匹配器（修改 EXCLUDE_KEYWORDS 后调用）。"""
+    global _keyword_matcher, _keyword_matcher_exclude
+    exclude_keywords = tuple(config.EXCLUDE_KEYWORDS)
+    _keyword_matcher = KeywordMatcher([
+        (COLLECTION_CATEGORY, COLLECTION_KEYWORDS),
+        *NON_EPISODE_KEYWORD_GROUPS,
+        (EXCLUDE_CATEGORY, list(exclude_keywords)),
+    ])
+    _keyword_matcher_exclude = exclude_keywords
+    return _keyword_matcher
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """获取关键词匹配器；检测到 EXCLUDE_KEYWORDS 变更时自动重建。"""
+    if _keyword_matcher is None or tuple(config.EXCLUDE_KEYWORDS) != _keyword_matcher_exclude:
+        return reload_keyword_matcher()
+    return _keyword_matcher
+
+
+def _find_collection_hit(
+    title: str, duration: int, hits: list[KeywordHit], numbers: TitleNumbers
+) -> Optional[FilterHit]:
     # 检测是否包含具体集数信息（如 "第5集"、"EP05"）
-    has_specific_ep = bool(re.search(
-        r'第\s*\d+\s*[集话話期回]|[Ee][Pp]?\s*\d+(?!\s*[-~～到至])',
-        title
-    ))
+    has_specific_ep = numbers.has_specific_episode
 
     # 1. 关键词检测（但如果有具体集数则放行）
-    for keyword in COLLECTION_KEYWORDS:
-        if keyword.lower() in title_lower:
-            # "合集" "全集" 但同时有具体集数 → 可能是频道名带"合集"
-            if has_specific_ep and keyword in ('合集', '大合集', '合辑'):
-                logger.debug(f"合集关键词 '{keyword}' 命中但有具体集数，放行: '{title}'")
-                continue
-            logger.debug(f"合集关键词命中: '{keyword}' in '{title}'")
-            return True
+    for hit in hits:
+        if hit.category != COLLECTION_CATEGORY:
+            continue
+        # "合集" "全集" 但同时有具体集数 → 可能是频道名带"合集"
+        if has_specific_ep and hit.keyword in COLLECTION_SOFT_KEYWORDS:
+            logger.debug(f"合集关键词 '{hit.keyword}' 命中但有具体集数，放行: '{title}'")
+            continue
+        logger.debug(f"合集关键词命中: '{hit.keyword}' in '{title}'")
+        return FilterHit(COLLECTION_CATEGORY, hit.keyword)
 
     # 2. 范围模式检测（如 "1-10集"）
-    match = COLLECTION_RANGE_PATTERN.search(title)
-    if match:
-        start, end = int(match.group(1)), int(match.group(2))
+    if numbers.episode_range:
+        start, end = numbers.episode_range
         if end - start >= 2:
             logger.debug(f"合集范围命中: {start}-{end} in '{title}'")
-            return True
+            return FilterHit(COLLECTION_CATEGORY, numbers.range_text)
 
     # 3. 全集模式检测（如 "全24集"）
-    if COLLECTION_ALL_PATTERN.search(title):
+    if numbers.total is not None:
         logger.debug(f"全集模式命中: '{title}'")
-        return True
+        return FilterHit(COLLECTION_CATEGORY, numbers.total_text)
 
     # 4. 时长检测（超过阈值视为合集）
     if duration > 0 and duration > config.COLLECTION_MAX_DURATION:
         # 如果有具体集数且时长不是特别夸张（<1.5倍阈值），放行
         if has_specific_ep and duration < config.COLLECTION_MAX_DURATION * 1.5:
             logger.debug(f"时长偏长但有具体集数，放行: '{title}' ({duration}s)")
-            return False
+            return None
         logger.debug(f"时长过长 ({duration}s > {config.COLLECTION_MAX_DURATION}s): '{title}'")
-        return True
+        return FilterHit("时长", f"{duration}s")
+
+    return None
 
-    return False
+
+def _find_non_episode_hit(title: str, hits: list[KeywordHit]) -> Optional[FilterHit]:
+    best: Optional[KeywordHit] = None
+    for hit in hits:
+        rank = _NON_EPISODE_CATEGORY_RANK.get(hit.category)
+        if rank is None:
+            continue
+        if best is None or rank < _NON_EPISODE_CATEGORY_RANK[best.category]:
+            best = hit
+    if best:
+        logger.debug(f"非正片[{best.category}]关键词命中: '{best.keyword}' in '{title}'")
+        return FilterHit(best.category, best.keyword)
+
+    # 额外检查全局排除关键词
+    for hit in hits:
+        if hit.category == EXCLUDE_CATEGORY:
+            return FilterHit(EXCLUDE_CATEGORY, hit.keyword)
+    return None
+
+
+def is_collection(title: str, duration: int = 0) -> bool:
+    """
+    检测是否为合集视频
+
+    改进：增加上下文判断，避免误过滤
+    - 标题同时包含具体集数（如"第5集"）时不过滤
+    - 仅当"合集"附近有范围词才过滤
+
+    Args:
+        title: 视频标题
+        duration: 视频时长（秒）
+
+    Returns:
+        是否为合集
+    """
+    hits = get_keyword_matcher().find_all(title)
+    return _find_collection_hit(title, duration, hits, parse_title_numbers(title)) is not None
 
 
 def is_non_episode_content(title: str) -> bool:
@@ -115,28 +241,30 @@ def is_non_episode_content(title: str) -> bool:
     Returns:
         是否为非正片
     """
-    title_lower = title.lower()
-
-    all_keyword_groups = [
-        ("剪辑", CLIP_KEYWORDS),
-        ("解说", COMMENTARY_KEYWORDS),
-        ("预告", PREVIEW_KEYWORDS),
-        ("音乐", MUSIC_KEYWORDS),
-        ("有声小说", AUDIO_STORY_KEYWORDS),
-    ]
-
-    for category, keywords in all_keyword_groups:
-        for keyword in keywords:
-            if keyword.lower() in title_lower:
-                logger.debug(f"非正片[{category}]关键词命中: '{keyword}' in '{title}'")
-                return True
+    hits = get_keyword_matcher().find_all(title)
+    return _find_non_episode_hit(title, hits) is not None
 
-    # 额外检查全局排除关键词
-    for keyword in config.EXCLUDE_KEYWORDS:
-        if keyword.lower() in title_lower:
-            return True
 
-    return False
+def check_filter(
+    title: str, duration: int = 0, numbers: Optional[TitleNumbers] = None
+) -> Optional[FilterHit]:
+    """
+    综合判断是否应过滤该视频，并给出命中的分类和关键词
+
+    标题只做一次关键词扫描，合集检测和非正片检测共用扫描结果。
+
+    Args:
+        title: 视频标题
+        duration: 视频时长（秒）
+        numbers: 已解析的集数信息（调用方已解析时传入，避免重复扫描）
+
+    Returns:
+        命中原因；不需过滤时返回 None
+    """
+    if numbers is None:
+        numbers = parse_title_numbers(title)
+    hits = get_keyword_matcher().find_all(title)
+    return _find_collection_hit(title, duration, hits, numbers) or _find_non_episode_hit(title, hits)
 
 
 def should_filter(title: str, duration: int = 0) -> bool:
@@ -150,4 +278,4 @@ def should_filter(title: str, duration: int = 0) -> bool:
     Returns:
         是否应过滤
     """
-    return is_collection(title, duration) or is_non_episode_content(title)
+    return check_filter(title, duration) is not None
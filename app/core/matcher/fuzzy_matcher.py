@@ -2,39 +2,91 @@
 追漫阁 - 模糊匹配算法
 """
 import logging
+import math
 from typing import Optional
 from app import config
 
 logger = logging.getLogger(__name__)
 
 
-def edit_distance(s1: str, s2: str) -> int:
+def edit_distance(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
     """
     计算两个字符串的编辑距离（Levenshtein Distance）
 
+    使用两行滚动数组，内存 O(min(m, n))。传入 max_distance 时只计算
+    |i - j| <= max_distance 的对角带（Ukkonen 剪枝），某一行带内最小值
+    超过上限即提前结束，时间降为 O(k·min(m, n))。
+
     Args:
         s1: 字符串1
         s2: 字符串2
+        max_distance: 有意义的最大距离；为 None 时计算精确距离
 
     Returns:
-        编辑距离
+        编辑距离；超过 max_distance 时返回 max_distance + 1
     """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
     m, n = len(s1), len(s2)
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-    for i in range(m + 1):
-        dp[i][0] = i
-    for j in range(n + 1):
-        dp[0][j] = j
 
+    if max_distance is None:
+        prev = list(range(n + 1))
+        cur = [0] * (n + 1)
+        for i in range(1, m + 1):
+            cur[0] = i
+            c1 = s1[i - 1]
+            for j in range(1, n + 1):
+                if c1 == s2[j - 1]:
+                    cur[j] = prev[j - 1]
+                else:
+                    cur[j] = 1 + min(prev[j], cur[j - 1], prev[j - 1])
+            prev, cur = cur, prev
+        return prev[n]
+
+    k = max(0, max_distance)
+    cap = k + 1
+    if m - n > k:
+        return cap
+    if n == 0:
+        return m
+
+    prev = [j if j <= k else cap for j in range(n + 1)]
+    cur = [cap] * (n + 1)
     for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if s1[i - 1] == s2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1]
+        lo = max(1, i - k)
+        hi = min(n, i + k)
+        cur[lo - 1] = i if lo == 1 and i <= k else cap
+        row_min = cur[lo - 1]
+        c1 = s1[i - 1]
+        for j in range(lo, hi + 1):
+            if c1 == s2[j - 1]:
+                value = prev[j - 1]
             else:
-                dp[i][j] = 1 + min(dp[i - 1][j], dp[i][j - 1], dp[i - 1][j - 1])
+                value = 1 + min(prev[j], cur[j - 1], prev[j - 1])
+            if value > cap:
+                value = cap
+            cur[j] = value
+            if value < row_min:
+                row_min = value
+        if hi < n:
+            cur[hi + 1] = cap
+        if row_min > k:
+            return cap
+        prev, cur = cur, prev
+
+    return prev[n]
+
+
+def edit_distance_cap(max_len: int, current_score: float, weight: float = 70.0) -> int:
+    """
+    由当前最佳分推出编辑距离的有效上限
 
-    return dp[m][n]
+    编辑距离分为 (1 - dist / max_len) * weight，只有 dist 不超过返回值时
+    才可能超过 current_score；返回 -1 表示无论距离多少都无法提分。
+    """
+    if max_len <= 0 or current_score >= weight:
+        return -1
+    return math.ceil(max_len * (1 - current_score / weight)) - 1
 
 
 def ngram_similarity(s1: str, s2: str, n: int = 2) -> float:
@@ -118,6 +170,122 @@ def partial_char_match_ratio(title: str, query: str) -> float:
     return matched / len(q)
 
 
+class _CompiledTitle:
+    """单个目标标题（动漫名或别名）的预计算特征。"""
+
+    __slots__ = ("text", "key", "lower", "ngrams")
+
+    def __init__(self, text: str, ngram_size: int):
+        self.text = text
+        self.key = text.strip().lower()
+        self.lower = text.lower()
+        self.ngrams = _get_ngrams(text, ngram_size)
+
+
+def _get_ngrams(text: str, size: int) -> set:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class CompiledTitleMatcher:
+    """
+    按动漫预编译的标题匹配器
+
+    一部动漫在整次同步中的目标标题和别名是固定的，这里把它们的
+    小写形式、N-gram 集合一次算好；每个视频标题也只计算一次自身特征，
+    再与所有别名比对，评分结果与 fuzzy_match_score 完全一致。
+    """
+
+    def __init__(self, target_title: str, aliases: Optional[list[str]] = None,
+                 ngram_size: Optional[int] = None):
+        """
+        Args:
+            target_title: 目标标题（动漫名称，已预处理）
+            aliases: 动漫别名列表
+            ngram_size: N-gram 大小，默认取 FUZZY_NGRAM_SIZE
+        """
+        self.target_title = target_title
+        self.ngram_size = config.FUZZY_NGRAM_SIZE if ngram_size is None else ngram_size
+        self._titles: list[_CompiledTitle] = []
+        if not target_title:
+            return
+
+        all_titles = [target_title]
+        if aliases:
+            all_titles.extend([a.lower().strip() for a in aliases])
+
+        seen = set()
+        for title in all_titles:
+            if not title or title in seen:
+                continue
+            seen.add(title)
+            self._titles.append(_CompiledTitle(title, self.ngram_size))
+
+    def score(self, source_title: str) -> float:
+        """
+        对单个视频标题评分
+
+        Args:
+            source_title: 源标题（视频标题，已预处理）
+
+        Returns:
+            匹配分数 (0.0 - 100.0)
+        """
+        if not source_title or not self._titles:
+            return 0.0
+
+        source_key = source_title.strip().lower()
+        source_lower = source_title.lower()
+        source_chars = set(source_lower)
+        source_ngrams = _get_ngrams(source_title, self.ngram_size)
+
+        best_score = 0.0
+
+        for title in self._titles:
+            score = 0.0
+
+            # 1. 精确匹配 → 满分
+            if source_key and source_key == title.key:
+                return 100.0
+
+            # 2. 包含匹配 → 高分
+            if source_key and title.key and (title.key in source_key or source_key in title.key):
+                score = 85.0
+
+            # 3. 子序列匹配（匹配缺字情况）
+            query = title.lower
+            qi = 0
+            query_len = len(query)
+            for ch in source_lower:
+                if qi < query_len and ch == query[qi]:
+                    qi += 1
+            subseq_ratio = qi / query_len
+            if subseq_ratio >= 0.8:
+                score = max(score, subseq_ratio * 80)
+
+            # 4. 字符重叠匹配（同音字/变体字）
+            char_ratio = sum(1 for ch in query if ch in source_chars) / query_len
+            if char_ratio >= 0.7:
+                score = max(score, char_ratio * 70)
+
+            # 5. N-gram 相似度评分
+            if source_ngrams and title.ngrams:
+                sim = len(source_ngrams & title.ngrams) / len(source_ngrams | title.ngrams)
+                score = max(score, sim * 75)
+
+            # 6. 编辑距离评分：只在可能超过已有最佳分时计算，并按上限剪枝
+            max_len = max(len(source_title), len(title.text))
+            cap = edit_distance_cap(max_len, max(score, best_score))
+            if cap >= 0:
+                dist = edit_distance(source_title, title.text, cap)
+                if dist <= cap:
+                    edit_score = max(0, (1 - dist / max_len)) * 70
+                    score = max(score, edit_score)
+
+            best_score = max(best_score, score)
+
+        return round(best_score, 2)
+
+
 def fuzzy_match_score(source_title: str, target_title: str,
                       aliases: Optional[list[str]] = None) -> float:
     """
@@ -133,52 +301,4 @@ def fuzzy_match_score(source_title: str, target_title: str,
     """
     if not source_title or not target_title:
         return 0.0
-
-    all_titles = [target_title]
-    if aliases:
-        all_titles.extend([a.lower().strip() for a in aliases])
-
-    best_score = 0.0
-
-    for title in all_titles:
-        if not title:
-            continue
-
-        score = 0.0
-
-        # 1. 精确匹配 → 满分
-        if exact_match(source_title, title):
-            return 100.0
-
-        # 2. 包含匹配 → 高分
-        if contains_match(source_title, title):
-            score = max(score, 85.0)
-
-        # 3. 子序列匹配（匄配缺字情况）
-        subseq_ratio = subsequence_match_ratio(source_title, title)
-        if subseq_ratio >= 0.8:
-            subseq_score = subseq_ratio * 80
-            score = max(score, subseq_score)
-
-        # 4. 字符重叠匹配（同音字/变体字）
-        char_ratio = partial_char_match_ratio(source_title, title)
-        if char_ratio >= 0.7:
-            char_score = char_ratio * 70
-            score = max(score, char_score)
-
-        # 5. 编辑距离评分
-        dist = edit_distance(source_title, title)
-        max_len = max(len(source_title), len(title))
-        if max_len > 0:
-            edit_score = max(0, (1 - dist / max_len)) * 70
-            score = max(score, edit_score)
-
-        # 6. N-gram 相似度评分
-        ngram_n = config.FUZZY_NGRAM_SIZE
-        sim = ngram_similarity(source_title, title, ngram_n)
-        ngram_score = sim * 75
-        score = max(score, ngram_score)
-
-        best_score = max(best_score, score)
-
-    return round(best_score, 2)
+    return CompiledTitleMatcher(target_title, aliases).score(source_title)
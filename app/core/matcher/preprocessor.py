@@ -3,7 +3,10 @@
 """
 import re
 import logging
-from typing import Optional
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional
+from app import config
+from app.core.metrics import NORMALIZE_CACHE_STATS
 
 logger = logging.getLogger(__name__)
 
@@ -51,14 +54,6 @@ HOMOPHONE_MAP: dict[str, str] = {
 PUNCT_PATTERN = re.compile(r'[【】\[\]()（）《》<>「」『』\-_—·•.,，。！!？?:：;；""\'''""&＆/\\|]')
 # 空白字符归一化
 WHITESPACE_PATTERN = re.compile(r'\s+')
-# 集数提取
-EPISODE_PATTERNS = [
-    re.compile(r'第\s*(\d+)\s*[集话話期回]'),
-    re.compile(r'[Ee][Pp]?\s*\.?\s*(\d+)'),
-    re.compile(r'#\s*(\d+)'),
-    re.compile(r'(\d+)\s*[集话話期回]'),
-    re.compile(r'[第]\s*([一二三四五六七八九十百千]+)\s*[集话話期回]'),
-]
 
 # 中文数字映射
 CN_NUM_MAP = {
@@ -93,16 +88,107 @@ def traditional_to_simplified(text: str) -> str:
     return text
 
 
+class HomophoneReplacer:
+    """
+    同音字映射的前缀树替换器
+
+    从左到右单次扫描文本，每个位置取最长命中的词条，替换结果不会被再次替换，
+    因此结果与字典顺序无关；不能作为词条首字的字符直接跳过，扫描耗时不随
+    映射条数增长。补全类词条（目标以源开头，如 "斗罗" → "斗罗大陆"）在文本
+    已经是完整形式时不再重复展开。
+    """
+
+    _END = ""
+
+    def __init__(self, mapping: dict[str, str]):
+        self._root: dict = {}
+        for src, dst in mapping.items():
+            if not src or src == dst:
+                continue
+            node = self._root
+            for ch in src:
+                node = node.setdefault(ch, {})
+            # 补全类词条记录已展开部分，命中时检查后文，避免重复展开
+            guard = dst[len(src):] if len(dst) > len(src) and dst.startswith(src) else ""
+            node[self._END] = (dst, guard)
+        self._first_chars = frozenset(self._root)
+
+    def replace(self, text: str) -> str:
+        if not self._first_chars:
+            return text
+        first_chars = self._first_chars
+        end_key = self._END
+        parts: list[str] = []
+        length = len(text)
+        last = 0
+        i = 0
+        while i < length:
+            if text[i] not in first_chars:
+                i += 1
+                continue
+            node = self._root
+            match_end = 0
+            match_dst = ""
+            j = i
+            while j < length:
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+                entry = node.get(end_key)
+                if entry and not (entry[1] and text.startswith(entry[1], j)):
+                    match_end = j
+                    match_dst = entry[0]
+            if match_end:
+                parts.append(text[last:i])
+                parts.append(match_dst)
+                i = last = match_end
+            else:
+                i += 1
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return "".join(parts)
+
+
+_homophone_replacer = HomophoneReplacer(HOMOPHONE_MAP)
+
+
+def reload_homophone_map() -> None:
+    """HOMOPHONE_MAP 变更后重建替换器，并清空归一化缓存"""
+    global _homophone_replacer
+    _homophone_replacer = HomophoneReplacer(HOMOPHONE_MAP)
+    clear_normalize_cache()
+
+
 def replace_homophones(text: str) -> str:
-    """替换同音字/常见错别字"""
-    for src, dst in HOMOPHONE_MAP.items():
-        text = text.replace(src, dst)
+    """替换同音字/常见错别字（单次扫描、最长优先）"""
+    return _homophone_replacer.replace(text)
+
+
+def _normalize_text_uncached(text: str) -> str:
+    text = traditional_to_simplified(text)
+    text = replace_homophones(text)
+    text = PUNCT_PATTERN.sub(' ', text)
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
+    text = text.lower()
     return text
 
 
+# 同一视频标题会在多个关键词、相邻集数的搜索结果中反复出现，
+# 动漫名称更是每个候选都要归一化一次，按原始字符串做有界 LRU 缓存
+_normalize_text_cached = lru_cache(maxsize=max(0, config.NORMALIZE_CACHE_SIZE))(_normalize_text_uncached)
+
+# 命中统计在 /metrics 抓取时从 cache_info() 读取，归一化热路径不额外计数
+for _stat, _field in (("hits", "hits"), ("misses", "misses"), ("size", "currsize")):
+    NORMALIZE_CACHE_STATS.labels(stat=_stat).set_function(
+        lambda field=_field: getattr(_normalize_text_cached.cache_info(), field)
+    )
+
+
 def normalize_text(text: str) -> str:
     """
-    文本归一化处理
+    文本归一化处理（带 LRU 缓存）
 
     1. 繁体转简体
     2. 同音字替换
@@ -110,12 +196,125 @@ def normalize_text(text: str) -> str:
     4. 空白归一化
     5. 小写
     """
-    text = traditional_to_simplified(text)
-    text = replace_homophones(text)
-    text = PUNCT_PATTERN.sub(' ', text)
-    text = WHITESPACE_PATTERN.sub(' ', text).strip()
-    text = text.lower()
-    return text
+    return _normalize_text_cached(text)
+
+
+def get_normalize_cache_stats() -> dict[str, Any]:
+    """获取归一化缓存命中统计"""
+    info = _normalize_text_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+def clear_normalize_cache() -> None:
+    """清空归一化缓存（同音字映射等规则变更后调用）"""
+    _normalize_text_cached.cache_clear()
+
+
+class TitleNumbers(NamedTuple):
+    """标题中的集数/季数信息，一次扫描得到。"""
+    episode: Optional[int] = None
+    season: Optional[int] = None
+    # 范围集数（如 "1-10集" → (1, 10)）及命中原文
+    episode_range: Optional[tuple[int, int]] = None
+    range_text: Optional[str] = None
+    # 全集数（如 "全24集" → 24）及命中原文
+    total: Optional[int] = None
+    total_text: Optional[str] = None
+    # 是否包含具体集数（如 "第5集"、"EP05"，"EP1-10" 这类范围不算）
+    has_specific_episode: bool = False
+
+
+_CN_SEASON_CHARS = frozenset('一二三四五六七八九十')
+
+# 集数/季数/范围/全集合并为一条正则：每个分支只消耗一个起始字符（数字分支消耗整段数字），
+# 其余部分放在前瞻中捕获，因此各规则的候选位置不会互相吞掉，
+# 按出现顺序取每条规则的第一个命中即与逐条 search 的结果一致
+TITLE_NUMBER_PATTERN = re.compile(
+    # 第N集 / 第N季 / 第五集 / 第二季
+    r'第(?=\s*(?:(?P<di_num>\d+)|(?P<di_cn>[一二三四五六七八九十百千]+))\s*(?P<di_suffix>[集话話期回季]))'
+    # EP05 / E.05 / ep 5（记录是否带点、后面是否紧跟范围分隔符）
+    r'|[Ee](?=[Pp]?\s*(?P<ep_dot>\.?)\s*(?P<ep_num>\d+)(?P<ep_range>\s*[-~～到至])?)'
+    # S2 / Season 2
+    r'|[Ss](?=(?:eason)?\s*(?P<season_num>\d+))'
+    # #12
+    r'|#(?=\s*(?P<hash_num>\d+))'
+    # 全24集 / 共12话
+    r'|[全共](?=(?P<total_tail>\s*(?P<total_num>\d+)\s*[集话話期回]))'
+    # 12集 / 1-10集（从整段数字开头匹配）
+    r'|(?<!\d)(?P<num>\d+)(?=\s*(?P<num_suffix>[集话話期回])'
+    r'|(?P<range_tail>\s*[-~～到至]\s*(?P<range_end>\d+)\s*[集话話期回]))'
+)
+
+
+def parse_title_numbers(text: str) -> TitleNumbers:
+    """
+    一次扫描提取标题中的集数、季数、范围集数和全集数
+
+    集数优先级：第N集 > EP/E > # > N集 > 第（中文数字）集；
+    季数优先级：第N季 > S/Season > 第（中文数字）季。
+    """
+    di_episode = ep_episode = hash_episode = num_episode = cn_episode = None
+    di_season = s_season = cn_season = None
+    episode_range = range_text = None
+    total = total_text = None
+    has_specific = False
+
+    for match in TITLE_NUMBER_PATTERN.finditer(text):
+        head = match.group(0)[0]
+        if head == '第':
+            di_num, di_cn, suffix = match.group("di_num", "di_cn", "di_suffix")
+            if suffix == '季':
+                if di_num is not None:
+                    if di_season is None:
+                        di_season = int(di_num)
+                elif cn_season is None and _CN_SEASON_CHARS.issuperset(di_cn):
+                    cn_season = cn_num_to_int(di_cn)
+            elif di_num is not None:
+                has_specific = True
+                if di_episode is None:
+                    di_episode = int(di_num)
+            elif cn_episode is None:
+                cn_episode = cn_num_to_int(di_cn)
+        elif head in 'Ee':
+            ep_dot, ep_num, ep_range = match.group("ep_dot", "ep_num", "ep_range")
+            if ep_episode is None:
+                ep_episode = int(ep_num)
+            # "EP1-10" 这类范围不算具体集数；多位数字时回溯后仍视为具体集数
+            if not ep_dot and (len(ep_num) > 1 or not ep_range):
+                has_specific = True
+        elif head in 'Ss':
+            if s_season is None:
+                s_season = int(match.group("season_num"))
+        elif head == '#':
+            if hash_episode is None:
+                hash_episode = int(match.group("hash_num"))
+        elif head in '全共':
+            if total is None:
+                total = int(match.group("total_num"))
+                total_text = head + match.group("total_tail")
+        else:
+            num, num_suffix, range_tail = match.group("num", "num_suffix", "range_tail")
+            if num_suffix:
+                if num_episode is None:
+                    num_episode = int(num)
+            elif episode_range is None:
+                episode_range = (int(num), int(match.group("range_end")))
+                range_text = num + range_tail
+
+    episode = di_episode
+    for candidate in (ep_episode, hash_episode, num_episode, cn_episode):
+        if episode is not None:
+            break
+        episode = candidate
+    season = di_season if di_season is not None else (s_season if s_season is not None else cn_season)
+    return TitleNumbers(episode, season, episode_range, range_text, total, total_text, has_specific)
 
 
 def extract_episode_number(text: str) -> Optional[int]:
@@ -125,35 +324,9 @@ def extract_episode_number(text: str) -> Optional[int]:
     Returns:
         集数号，未找到返回 None
     """
-    for pattern in EPISODE_PATTERNS:
-        match = pattern.search(text)
-        if match:
-            num_str = match.group(1)
-            # 检查是否为中文数字
-            if re.match(r'^[一二三四五六七八九十百千]+$', num_str):
-                return cn_num_to_int(num_str)
-            try:
-                return int(num_str)
-            except ValueError:
-                continue
-    return None
+    return parse_title_numbers(text).episode
 
 
 def extract_season_number(text: str) -> Optional[int]:
     """从文本中提取季数"""
-    patterns = [
-        re.compile(r'第\s*(\d+)\s*季'),
-        re.compile(r'[Ss](?:eason)?\s*(\d+)'),
-        re.compile(r'第\s*([一二三四五六七八九十]+)\s*季'),
-    ]
-    for pattern in patterns:
-        match = pattern.search(text)
-        if match:
-            num_str = match.group(1)
-            if re.match(r'^[一二三四五六七八九十]+$', num_str):
-                return cn_num_to_int(num_str)
-            try:
-                return int(num_str)
-            except ValueError:
-                continue
-    return None
+    return parse_title_numbers(text).season
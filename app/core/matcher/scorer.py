@@ -2,15 +2,27 @@
 追漫阁 - 综合评分系统
 """
 import logging
+import threading
 import time
-from typing import Optional
-from app.core.matcher.preprocessor import normalize_text, extract_episode_number
-from app.core.matcher.fuzzy_matcher import fuzzy_match_score
-from app.core.matcher.collection_filter import should_filter
+from operator import attrgetter
+from typing import Any, NamedTuple, Optional
+from app.core.matcher.preprocessor import TitleNumbers, normalize_text, parse_title_numbers
+from app.core.matcher.fuzzy_matcher import CompiledTitleMatcher
+from app.core.matcher.collection_filter import FilterHit, check_filter
+from app.core.candidate import VideoCandidate
+from app.core.metrics import TRUSTED_CHANNEL_LOOKUPS_SAVED
 from app.db import database as db
 
 logger = logging.getLogger(__name__)
 
+# NumPy 可选：存在时批量评分的数值维度按列向量计算，否则逐项计算
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
 # 画质关键词 → 加分值（出现即加分，优先排序）
 QUALITY_BONUS_KEYWORDS = {
     "4k": 10, "4K": 10,
@@ -130,173 +142,303 @@ def _resolve_confidence_tier(
     return "C"
 
 
-def _get_tiered_score(
-    tier: str,
-    title_score: float,
-    episode_score: float,
-    channel_score: float,
-    recency_score: float,
-    view_score: float,
-    quality_bonus: float,
-) -> float:
-    tie_score = (
-        title_score * 0.35 +
-        episode_score * 0.20 +
-        channel_score * 0.15 +
-        recency_score * 0.15 +
-        view_score * 0.10 +
-        quality_bonus * 0.50
+def build_title_matcher(
+    anime_title: str,
+    aliases: Optional[list[str]] = None,
+    normalized_title: Optional[str] = None,
+) -> CompiledTitleMatcher:
+    """按动漫名称和别名构建标题匹配器；未传入 normalized_title 时先做文本归一化。"""
+    if normalized_title is None:
+        normalized_title = normalize_text(anime_title)
+    return CompiledTitleMatcher(normalized_title, aliases)
+
+
+class ParsedTitle(NamedTuple):
+    """视频标题中与目标集数无关的解析结果：过滤结论、归一化文本、集数/季数、标题分和画质加分。"""
+    filter_hit: Optional[FilterHit]
+    normalized_title: str
+    numbers: TitleNumbers
+    title_score: float
+    quality_bonus: float
+
+
+def parse_video_title(video_title: str, duration: int, matcher: CompiledTitleMatcher) -> ParsedTitle:
+    """
+    解析视频标题中与目标集数无关的部分
+
+    被合集/非正片规则过滤的视频不再做归一化和标题匹配。
+    """
+    # 集数信息只解析一次，合集过滤与集数校验共用
+    numbers = parse_title_numbers(video_title)
+    filter_hit = check_filter(video_title, duration, numbers)
+    if filter_hit:
+        return ParsedTitle(filter_hit, "", numbers, 0.0, 0.0)
+    normalized_title = normalize_text(video_title)
+    return ParsedTitle(
+        None,
+        normalized_title,
+        numbers,
+        matcher.score(normalized_title),
+        _get_quality_bonus(video_title),
     )
-    tie_breaker = min(9.99, tie_score / 10)
-    return round(CONFIDENCE_TIERS[tier]["base_score"] + tie_breaker, 2)
 
 
-def source_sort_key(video: dict) -> tuple:
-    """视频源排序键：置信等级优先，同级内再看质量、时效和播放量。"""
-    detail = video.get("score_detail") or {}
+def is_high_confidence(parsed: ParsedTitle, target_episode: int) -> bool:
+    """未被过滤、标题强匹配且集数精确命中（至少 A 级）的候选"""
     return (
-        detail.get("confidence_rank", 0),
-        detail.get("episode_score", 0),
-        detail.get("title_score", 0),
-        1 if detail.get("trusted_channel") else 0,
-        HEALTH_RANK.get((video.get("health_status") or "unknown").lower(), 2),
-        _to_int(video.get("published_timestamp")),
-        _to_int(video.get("view_count")),
-        detail.get("quality_bonus", 0),
-        video.get("match_score", detail.get("total_score", 0)),
+        parsed.filter_hit is None
+        and parsed.numbers.episode == target_episode
+        and parsed.title_score >= TITLE_STRONG_THRESHOLD
     )
 
 
-def score_video(
-    video: dict,
-    anime_title: str,
-    target_episode: int,
-    aliases: Optional[list[str]] = None,
-) -> dict:
+class ParsedTitleCache:
     """
-    为视频源进行综合评分
-
-    评分策略:
-    - 硬过滤：合集、非正片、标题弱匹配、明确错集数直接出局
-    - 置信等级：S/A/B/C 分层，集数精确命中的源天然排在未识别集数前
-    - 同级排序：标题、可信频道、时效、播放量、画质只在同等级内影响顺序
+    同步级标题解析缓存，按 video_id 复用 ParsedTitle
 
-    Args:
-        video: 视频信息字典
-        anime_title: 动漫名称
-        target_episode: 目标集数
-        aliases: 动漫别名列表
-
-    Returns:
-        评分结果字典，包含 total_score、confidence_tier 和各维度分数
+    同一视频会在多个关键词、相邻集数的搜索结果中反复出现，解析结果只与标题、
+    时长和动漫匹配器有关，因此一部动漫的一次同步内共用一个缓存，
+    每集评分只需再算与目标集数相关的部分。缓存绑定构建时的匹配器。
     """
-    video_title = video.get("title", "")
-    duration = video.get("duration", 0)
 
-    # 前置过滤：合集/非正片
-    if should_filter(video_title, duration):
+    def __init__(self, matcher: CompiledTitleMatcher):
+        self.matcher = matcher
+        self._entries: dict[str, ParsedTitle] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, video_id: str, video_title: str, duration: int) -> ParsedTitle:
+        if not video_id:
+            return parse_video_title(video_title, duration, self.matcher)
+        with self._lock:
+            parsed = self._entries.get(video_id)
+            if parsed is not None:
+                self.hits += 1
+                return parsed
+            self.misses += 1
+        # 解析放在锁外；并发下同一视频偶尔重复解析，结果相同，直接覆盖即可
+        parsed = parse_video_title(video_title, duration, self.matcher)
+        with self._lock:
+            self._entries[video_id] = parsed
+        return parsed
+
+    def stats(self) -> dict[str, Any]:
+        """获取缓存命中统计"""
+        lookups = self.hits + self.misses
         return {
-            "total_score": 0,
-            "title_score": 0,
-            "episode_score": 0,
-            "channel_score": 0,
-            "recency_score": 0,
-            "filtered": True,
-            "filter_reason": "合集/非正片内容",
-            "detected_episode": None,
-            "confidence_tier": "",
-            "confidence_rank": 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
         }
 
-    # 文本预处理
-    normalized_video_title = normalize_text(video_title)
-    normalized_anime_title = normalize_text(anime_title)
 
-    # 1. 标题匹配分 (0-100)
-    title_score = fuzzy_match_score(
-        normalized_video_title,
-        normalized_anime_title,
-        aliases
-    )
+class ScoringContext:
+    """一次批量评分的共享参数：目标动漫、目标集数和通过阈值。"""
+
+    def __init__(
+        self,
+        anime_title: str,
+        target_episode: int,
+        aliases: Optional[list[str]] = None,
+        matcher: Optional[CompiledTitleMatcher] = None,
+        min_score: float = 0.0,
+        trusted_channels: Optional[frozenset[str]] = None,
+        parse_cache: Optional[ParsedTitleCache] = None,
+    ):
+        self.anime_title = anime_title
+        self.target_episode = target_episode
+        self.aliases = aliases
+        if matcher is None and parse_cache is not None:
+            matcher = parse_cache.matcher
+        self.matcher = matcher or build_title_matcher(anime_title, aliases)
+        # 缓存的标题分依赖匹配器，匹配器不一致时不能复用
+        self.parse_cache = parse_cache if parse_cache and parse_cache.matcher is self.matcher else None
+        self.min_score = min_score
+        self.trusted_channels = (
+            db.get_trusted_channel_ids() if trusted_channels is None else trusted_channels
+        )
+
+
+# 数值维度的分档：(下界, 分数)，取值严格大于下界时命中
+_VIEW_SCORE_STEPS = ((1000000, 100.0), (100000, 80.0), (10000, 60.0), (1000, 40.0), (0, 20.0))
+_RECENCY_SCORE_STEPS = ((7, 100.0), (30, 80.0), (90, 60.0), (365, 40.0))
+
+
+def _view_scores(view_counts: list[int]) -> list[float]:
+    if HAS_NUMPY:
+        counts = np.asarray(view_counts, dtype=np.int64)
+        scores = np.select(
+            [counts > bound for bound, _ in _VIEW_SCORE_STEPS],
+            [score for _, score in _VIEW_SCORE_STEPS],
+            default=0.0,
+        )
+        return scores.tolist()
+    return [_get_view_score({"view_count": count}) for count in view_counts]
+
+
+def _recency_scores(timestamps: list[int], now: int) -> list[float]:
+    if HAS_NUMPY:
+        published = np.asarray(timestamps, dtype=np.int64)
+        age_days = np.maximum(0, (now - published) / 86400)
+        scores = np.select(
+            [age_days <= days for days, _ in _RECENCY_SCORE_STEPS],
+            [score for _, score in _RECENCY_SCORE_STEPS],
+            default=20.0,
+        )
+        return np.where(published > 0, scores, 50.0).tolist()
+    return [_get_recency_score({"published_timestamp": ts}) for ts in timestamps]
+
+
+def _tie_scores(
+    title_scores: list[float],
+    episode_scores: list[float],
+    channel_scores: list[float],
+    recency_scores: list[float],
+    view_scores: list[float],
+    quality_bonuses: list[float],
+) -> list[float]:
+    if HAS_NUMPY:
+        tie = (
+            np.asarray(title_scores) * 0.35 +
+            np.asarray(episode_scores) * 0.20 +
+            np.asarray(channel_scores) * 0.15 +
+            np.asarray(recency_scores) * 0.15 +
+            np.asarray(view_scores) * 0.10 +
+            np.asarray(quality_bonuses) * 0.50
+        )
+        return tie.tolist()
+    return [
+        t * 0.35 + e * 0.20 + c * 0.15 + r * 0.15 + v * 0.10 + q * 0.50
+        for t, e, c, r, v, q in zip(
+            title_scores, episode_scores, channel_scores,
+            recency_scores, view_scores, quality_bonuses,
+        )
+    ]
+
+
+def score_videos(
+    videos: list[VideoCandidate],
+    context: ScoringContext,
+    stats: Optional[dict] = None,
+) -> list[VideoCandidate]:
+    """
+    批量评分候选视频，只返回通过过滤且达到阈值的视频
 
-    if title_score < TITLE_ACCEPT_THRESHOLD:
-        return {
-            "total_score": 0,
-            "title_score": round(title_score, 2),
-            "episode_score": 0,
-            "channel_score": 0,
-            "recency_score": 0,
-            "filtered": True,
-            "filter_reason": "标题匹配度过低",
-            "detected_episode": None,
-            "confidence_tier": "",
-            "confidence_rank": 0,
-        }
+    先逐项完成过滤、标题匹配和集数识别这些字符串维度，
+    再把幸存者的频道、时效、播放量、画质按列一次算完。
+    上下文带有 ParsedTitleCache 时，字符串维度按 video_id 复用，只重算集数相关部分。
+    信任频道由上下文中的集合判定，不访问数据库。
 
-    detected_ep = extract_episode_number(video_title)
-    if detected_ep is not None:
-        if detected_ep != target_episode:
-            return {
-                "total_score": 0,
-                "title_score": round(title_score, 2),
-                "episode_score": 0,
-                "channel_score": 0,
-                "recency_score": 0,
-                "filtered": True,
-                "filter_reason": f"集数不匹配：检测到第{detected_ep}集",
-                "detected_episode": detected_ep,
-                "confidence_tier": "",
-                "confidence_rank": 0,
-            }
-        episode_score = 100.0
-    else:
-        episode_score = 20.0
-
-    channel_id = video.get("channel_id", "")
-    trusted_channel = bool(channel_id and db.is_trusted_channel(channel_id))
-    channel_score = _get_channel_score(trusted_channel)
-    recency_score = _get_recency_score(video)
-    view_score = _get_view_score(video)
-    quality_bonus = _get_quality_bonus(video_title)
-    confidence_tier = _resolve_confidence_tier(
-        title_score,
-        detected_ep,
-        trusted_channel,
-    )
+    Args:
+        videos: 候选视频列表
+        context: 评分上下文（目标动漫、集数、匹配器、阈值和标题解析缓存）
+        stats: 可选统计字典，写入 filtered / below_threshold / accepted 计数
 
-    total_score = _get_tiered_score(
-        confidence_tier,
-        title_score,
-        episode_score,
-        channel_score,
-        recency_score,
-        view_score,
-        quality_bonus,
-    )
-    confidence = CONFIDENCE_TIERS[confidence_tier]
-
-    result = {
-        "total_score": total_score,
-        "title_score": round(title_score, 2),
-        "episode_score": round(episode_score, 2),
-        "channel_score": round(channel_score, 2),
-        "recency_score": round(recency_score, 2),
-        "view_score": round(view_score, 2),
-        "filtered": False,
-        "filter_reason": "",
-        "detected_episode": detected_ep,
-        "quality_bonus": quality_bonus,
-        "trusted_channel": trusted_channel,
-        "confidence_tier": confidence_tier,
-        "confidence_rank": confidence["rank"],
-        "confidence_label": confidence["label"],
-    }
-
-    logger.debug(
-        f"评分: '{video_title}' → {confidence_tier}级 总分={result['total_score']} "
-        f"(标题={title_score:.1f}, 集数={episode_score:.1f}, "
-        f"频道={channel_score:.1f}, 时效={recency_score:.1f}, "
-        f"播放={view_score:.1f}, 画质+{quality_bonus:.1f})"
+    Returns:
+        按排序键降序排列的候选视频，match_score、confidence_tier 和 sort_key 已填写
+    """
+    matcher = context.matcher
+    parse_cache = context.parse_cache
+    target_episode = context.target_episode
+    filtered_count = 0
+
+    survivors: list[VideoCandidate] = []
+    title_scores: list[float] = []
+    episode_scores: list[float] = []
+    detected_episodes: list[Optional[int]] = []
+    quality_bonuses: list[float] = []
+
+    for video in videos:
+        video_title = video.title
+        if parse_cache:
+            parsed = parse_cache.get(video.video_id, video_title, video.duration)
+        else:
+            parsed = parse_video_title(video_title, video.duration, matcher)
+        filter_hit = parsed.filter_hit
+        if filter_hit:
+            filtered_count += 1
+            logger.debug(f"过滤: '{video_title}' - {filter_hit.reason}")
+            continue
+
+        title_score = parsed.title_score
+        if title_score < TITLE_ACCEPT_THRESHOLD:
+            filtered_count += 1
+            logger.debug(f"过滤: '{video_title}' - 标题匹配度过低")
+            continue
+
+        detected_ep = parsed.numbers.episode
+        if detected_ep is not None and detected_ep != target_episode:
+            filtered_count += 1
+            logger.debug(f"过滤: '{video_title}' - 集数不匹配：检测到第{detected_ep}集")
+            continue
+
+        survivors.append(video)
+        title_scores.append(title_score)
+        episode_scores.append(100.0 if detected_ep is not None else 20.0)
+        detected_episodes.append(detected_ep)
+        quality_bonuses.append(parsed.quality_bonus)
+
+    trusted_channels = context.trusted_channels
+    trusted_flags: list[bool] = []
+    lookups = 0
+    for video in survivors:
+        channel_id = video.channel_id
+        if channel_id:
+            lookups += 1
+        trusted_flags.append(bool(channel_id and channel_id in trusted_channels))
+    if lookups:
+        TRUSTED_CHANNEL_LOOKUPS_SAVED.inc(lookups)
+
+    view_counts = [_to_int(video.view_count) for video in survivors]
+    timestamps = [_to_int(video.published_timestamp) for video in survivors]
+    channel_scores = [_get_channel_score(flag) for flag in trusted_flags]
+    view_scores = _view_scores(view_counts)
+    recency_scores = _recency_scores(timestamps, int(time.time()))
+    tie_scores = _tie_scores(
+        title_scores, episode_scores, channel_scores,
+        recency_scores, view_scores, quality_bonuses,
     )
 
-    return result
+    # 搜索结果没有健康状态，按 unknown 参与排序
+    health_rank = HEALTH_RANK["unknown"]
+    accepted: list[VideoCandidate] = []
+    below_threshold_count = 0
+    for index, video in enumerate(survivors):
+        title_score = title_scores[index]
+        trusted_channel = trusted_flags[index]
+        confidence_tier = _resolve_confidence_tier(title_score, detected_episodes[index], trusted_channel)
+        confidence = CONFIDENCE_TIERS[confidence_tier]
+        total_score = round(confidence["base_score"] + min(9.99, tie_scores[index] / 10), 2)
+
+        if total_score < context.min_score:
+            below_threshold_count += 1
+            logger.debug(
+                f"低分: '{video.title}' = {total_score:.1f} "
+                f"(阈值: {context.min_score})"
+            )
+            continue
+
+        video.match_score = total_score
+        video.confidence_tier = confidence_tier
+        video.sort_key = (
+            confidence["rank"],
+            round(episode_scores[index], 2),
+            round(title_score, 2),
+            1 if trusted_channel else 0,
+            health_rank,
+            timestamps[index],
+            view_counts[index],
+            quality_bonuses[index],
+            total_score,
+        )
+        accepted.append(video)
+
+    accepted.sort(key=attrgetter("sort_key"), reverse=True)
+
+    if stats is not None:
+        stats["filtered"] = filtered_count
+        stats["below_threshold"] = below_threshold_count
+        stats["accepted"] = len(accepted)
+    return accepted
@@ -0,0 +1,52 @@
+"""
+追漫阁 - 业务指标
+
+集中定义同步链路的 Prometheus 指标，由 /metrics 端点统一导出。
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+TRUSTED_CHANNEL_LOOKUPS_SAVED = Counter(
+    'zhuimange_trusted_channel_lookups_saved_total',
+    'Trusted channel checks answered from the in-memory index instead of a SQLite query',
+)
+
+NORMALIZE_CACHE_STATS = Gauge(
+    'zhuimange_normalize_cache',
+    'normalize_text LRU cache statistics since process start (hits, misses, size)',
+    ['stat'],
+)
+
+SEARCH_CACHE_REQUESTS = Counter(
+    'zhuimange_search_cache_requests_total',
+    'Invidious search lookups against the persistent search cache',
+    ['result'],
+)
+
+INVIDIOUS_THROTTLE_SECONDS = Counter(
+    'zhuimange_invidious_throttle_seconds_total',
+    'Seconds spent waiting on the per-instance Invidious request rate limit',
+)
+
+DB_POOL_EVENTS = Counter(
+    'zhuimange_db_pool_events_total',
+    'SQLite connection pool events (checkout, wait, create, discard)',
+    ['event'],
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    'zhuimange_db_pool_connections',
+    'SQLite connections currently opened by the pool',
+)
+
+SYNC_QUEUE_DEPTH = Gauge(
+    'zhuimange_sync_queue_depth',
+    'Sync tasks waiting in the queue, by priority class',
+    ['priority'],
+)
+
+SYNC_QUEUE_WAIT_SECONDS = Histogram(
+    'zhuimange_sync_queue_wait_seconds',
+    'Time a sync task waited in the queue before a worker picked it up, by priority class',
+    ['priority'],
+    buckets=(1, 5, 15, 60, 300, 900, 1800, 3600, 7200, 14400),
+)
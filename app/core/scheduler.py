@@ -1,23 +1,133 @@
 """
 追漫阁 - 任务调度器
 """
+import heapq
 import logging
-from datetime import datetime
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
 import requests
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from app import config
 from app.db import database as db
 
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler(timezone="Asia/Shanghai")
 
+# interval 模式：到期但本轮未同步成功（被跳过/失败）的动漫推迟一个周期，避免反复立即到期
+_deferred_until: dict[int, float] = {}
+# 相差不到该秒数的到期时间合并到同一次唤醒
+_DUE_SLACK_SECONDS = 60
+# 计算下次唤醒时间失败时，隔这么久重试
+_SCHEDULE_RETRY_SECONDS = 300
+# interval 模式：是否有自动同步检查正在执行（执行期间一次性唤醒任务已被移除）
+_auto_sync_active = False
+
+
+def _parse_sync_time(value: Optional[str]) -> Optional[float]:
+    """解析 last_sync_at（SQLite CURRENT_TIMESTAMP，UTC）为时间戳"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _sync_interval_seconds(anime: dict, default_minutes: int) -> int:
+    """动漫的同步间隔；sync_interval 为 0 时使用全局 auto_sync_interval"""
+    return max(1, anime.get("sync_interval") or default_minutes) * 60
+
+
+def _build_due_heap(animes: list[dict], default_minutes: int, now: float) -> list[tuple[float, int]]:
+    """按 last_sync_at + 同步间隔构建到期时间最小堆；从未同步的动漫立即到期"""
+    heap = []
+    for anime in animes:
+        last_sync = _parse_sync_time(anime.get("last_sync_at"))
+        due = last_sync + _sync_interval_seconds(anime, default_minutes) if last_sync else now
+        heap.append((max(due, _deferred_until.get(anime["id"], 0.0)), anime["id"]))
+    heapq.heapify(heap)
+    return heap
+
+
+def _pop_due_animes(animes: list[dict], default_minutes: int) -> list[dict]:
+    """取出已到期的动漫，并把它们推迟一个周期（同步成功后 last_sync_at 会给出同样的到期时间）"""
+    now = time.time()
+    heap = _build_due_heap(animes, default_minutes, now)
+    due_ids = set()
+    while heap and heap[0][0] <= now + _DUE_SLACK_SECONDS:
+        due_ids.add(heapq.heappop(heap)[1])
+    due_animes = [anime for anime in animes if anime["id"] in due_ids]
+    for anime in due_animes:
+        _deferred_until[anime["id"]] = now + _sync_interval_seconds(anime, default_minutes)
+    return due_animes
+
+
+def _schedule_next_auto_sync() -> None:
+    """interval 模式：按最早到期的动漫安排下一次唤醒"""
+    if not scheduler.running:
+        return
+    now = time.time()
+    try:
+        default_minutes = int(db.get_setting("auto_sync_interval", "360"))
+        heap = _build_due_heap(db.get_all_animes(), default_minutes, now)
+        next_due = heap[0][0] if heap else now + default_minutes * 60
+        wake_at = min(
+            max(next_due, now + _DUE_SLACK_SECONDS),
+            now + max(1, config.AUTO_SYNC_MAX_SLEEP_MINUTES) * 60,
+        )
+    except Exception as e:
+        wake_at = now + _SCHEDULE_RETRY_SECONDS
+        logger.error(f"计算下次自动同步时间失败，{_SCHEDULE_RETRY_SECONDS} 秒后重试: {e}")
+
+    run_date = datetime.fromtimestamp(wake_at, tz=timezone.utc)
+    try:
+        # 错过触发时间（调度器繁忙、系统时钟跳变）仍然执行，否则一次性任务被丢弃后自动同步会停止
+        scheduler.add_job(
+            check_and_sync,
+            trigger=DateTrigger(run_date=run_date),
+            id="auto_sync",
+            name="自动同步视频源",
+            replace_existing=True,
+            misfire_grace_time=None,
+            coalesce=True,
+        )
+        logger.info(f"下次自动同步检查: {run_date.astimezone().strftime('%Y-%m-%d %H:%M:%S')}")
+    except Exception as e:
+        logger.error(f"安排下次自动同步失败: {e}")
+
+
+def _ensure_auto_sync_scheduled() -> None:
+    """兜底检查：interval 模式下一次性唤醒任务丢失时重新安排"""
+    if _auto_sync_active or scheduler.get_job("auto_sync") is not None:
+        return
+    logger.warning("自动同步唤醒任务丢失，重新安排")
+    _schedule_next_auto_sync()
+
 
 def check_and_sync():
     """
     检查并同步需要更新的动漫，同步完成后推送新集通知。
+
+    interval 模式下只同步到期的动漫，结束后按下一个到期时间安排唤醒。
     """
-    from app.core.sync_queue import sync_queue
+    global _auto_sync_active
+    _auto_sync_active = True
+    try:
+        _check_and_sync()
+    finally:
+        _auto_sync_active = False
+        if config.SYNC_SCHEDULE_MODE != "calendar":
+            _schedule_next_auto_sync()
+
+
+def _check_and_sync():
+    from app.core.airing_calendar import calendar_sync_due
+    from app.core.sync_queue import PRIORITY_FRESH, PRIORITY_INCREMENTAL, sync_queue
+    from app.core.sync_service import needs_auto_sync
 
     try:
         settings = db.get_all_settings()
@@ -27,28 +137,76 @@ def check_and_sync():
             return
 
         animes = db.get_all_animes()
+        default_minutes = int(settings.get("auto_sync_interval", "360"))
         notify_enabled = settings.get("tg_notify_enabled", "false") == "true"
+        calendar_mode = config.SYNC_SCHEDULE_MODE == "calendar"
+        if not calendar_mode:
+            animes = _pop_due_animes(animes, default_minutes)
+            if not animes:
+                logger.info("没有到期需要同步的动漫")
+                return
 
         synced_count = 0
         newly_sourced = []  # [(title, [(ep_num, source_count), ...])]
-
+        # 一次聚合查询得到全库缺源集数和同步时间，无事可做的动漫不排队
+        today = date.today().isoformat()
+        sync_plan = db.get_library_sync_plan(today)
+        idle_count = 0
+        # calendar 模式：按开播日历判断，只轮询开播窗口内的动漫
+        if calendar_mode:
+            recent_air_dates = db.get_recent_air_dates(today)
+            interval_hours = default_minutes / 60
+            now = datetime.now()
+        # 近期有新集开播的动漫优先同步
+        fresh_since = (datetime.now() - timedelta(hours=config.SYNC_FRESH_AIRED_HOURS)).date().isoformat()
+
+        # 先把需要同步的动漫全部入队，由队列的多个 worker 并发执行；
+        # 再逐个等待结果，单部动漫慢不会拖住其余动漫的开始时间
+        pending = []  # [(anime, task, pre_counts)]
         for anime in animes:
             # 跳过已完结且已看完的动漫
             if (anime.get("status") == "Ended" and
                     anime.get("watched_ep", 0) >= anime.get("total_episodes", 0) > 0):
                 continue
 
+            plan = sync_plan.get(anime["id"])
+            if calendar_mode:
+                should_sync, reason = calendar_sync_due(
+                    anime, plan, recent_air_dates.get(anime["id"], []), now, interval_hours
+                )
+            else:
+                # 刷新周期就是该动漫自己的同步间隔（扣除合并唤醒的提前量，到期即刷新）
+                refresh_seconds = _sync_interval_seconds(anime, default_minutes) - _DUE_SLACK_SECONDS
+                should_sync, reason = needs_auto_sync(anime, plan, refresh_seconds / 3600)
+            if not should_sync:
+                idle_count += 1
+                logger.debug(f"跳过自动同步（{reason}）: {anime['title_cn']}")
+                continue
+
             try:
                 # 通知开启时：同步前记录无源集数
                 pre_counts = {}
                 if notify_enabled:
                     pre_counts = db.get_episode_source_counts(anime["id"])
 
-                task, created = sync_queue.enqueue(anime["id"], mode="incremental", sync_type="auto")
+                fresh = bool(plan and plan["latest_air_date"] >= fresh_since)
+                task, created = sync_queue.enqueue(
+                    anime["id"],
+                    mode="incremental",
+                    sync_type="auto",
+                    priority=PRIORITY_FRESH if fresh else PRIORITY_INCREMENTAL,
+                )
                 if not created:
                     logger.info(f"跳过自动同步，已有任务正在执行: {anime['title_cn']}")
                     continue
+                pending.append((anime, task, pre_counts))
+            except Exception as e:
+                _log_auto_sync_error(anime, e)
 
+        logger.info(f"自动同步已入队 {len(pending)} 部动漫，{idle_count} 部无需同步")
+
+        for anime, task, pre_counts in pending:
+            try:
                 task_snapshot = sync_queue.wait_for_completion(task.id)
                 result = (task_snapshot or {}).get("result") or {}
 
@@ -72,29 +230,36 @@ def check_and_sync():
                             newly_sourced.append((anime["title_cn"], new_eps))
 
             except Exception as e:
-                logger.error(f"同步异常: {anime['title_cn']} - {e}")
-                db.add_sync_log(
-                    anime_id=anime["id"],
-                    sync_type="auto",
-                    episodes_synced=0,
-                    sources_found=0,
-                    status="error",
-                    message=str(e),
-                )
+                _log_auto_sync_error(anime, e)
 
         # 发送新集通知
         if newly_sourced:
             _send_new_episode_notification(newly_sourced)
 
-        # 清理过期日志
+        # 清理过期日志和搜索缓存
         db.cleanup_old_sync_logs()
+        from app.core.invidious_client import prune_search_cache
+        prune_search_cache()
 
-        logger.info(f"自动同步完成: {synced_count}/{len(animes)} 部动漫")
+        logger.info(f"自动同步完成: {synced_count}/{len(animes)} 部动漫，{idle_count} 部无需同步")
 
     except Exception as e:
         logger.exception(f"自动同步任务异常: {e}")
 
 
+def _log_auto_sync_error(anime: dict, error: Exception) -> None:
+    """记录单部动漫自动同步异常"""
+    logger.error(f"同步异常: {anime['title_cn']} - {error}")
+    db.add_sync_log(
+        anime_id=anime["id"],
+        sync_type="auto",
+        episodes_synced=0,
+        sources_found=0,
+        status="error",
+        message=str(error),
+    )
+
+
 def _send_new_episode_notification(updates: list):
     """发送新集视频源通知到 Telegram"""
     from app import config as app_config
@@ -138,13 +303,24 @@ def start_scheduler():
         settings = db.get_all_settings()
         interval_minutes = int(settings.get("auto_sync_interval", "360"))
 
-        scheduler.add_job(
-            check_and_sync,
-            trigger=IntervalTrigger(minutes=interval_minutes),
-            id="auto_sync",
-            name="自动同步视频源",
-            replace_existing=True,
-        )
+        # calendar 模式按固定检查间隔触发，由开播日历决定同步哪些动漫；
+        # interval 模式在调度器启动后按最早到期的动漫安排唤醒
+        if config.SYNC_SCHEDULE_MODE == "calendar":
+            scheduler.add_job(
+                check_and_sync,
+                trigger=IntervalTrigger(minutes=max(1, config.SYNC_CALENDAR_TICK_MINUTES)),
+                id="auto_sync",
+                name="自动同步视频源",
+                replace_existing=True,
+            )
+        else:
+            scheduler.add_job(
+                _ensure_auto_sync_scheduled,
+                trigger=IntervalTrigger(minutes=max(1, config.AUTO_SYNC_MAX_SLEEP_MINUTES)),
+                id="auto_sync_watchdog",
+                name="自动同步兜底检查",
+                replace_existing=True,
+            )
 
         # 定时 TG 备份
         tg_enabled = settings.get("tg_backup_enabled", "false") == "true"
@@ -160,7 +336,9 @@ def start_scheduler():
             logger.info(f"定时 TG 备份已启用，间隔: {tg_days} 天")
 
         scheduler.start()
-        logger.info(f"调度器已启动，同步间隔: {interval_minutes} 分钟")
+        if config.SYNC_SCHEDULE_MODE != "calendar":
+            _schedule_next_auto_sync()
+        logger.info(f"调度器已启动，模式: {config.SYNC_SCHEDULE_MODE}，默认同步间隔: {interval_minutes} 分钟")
     except Exception as e:
         logger.error(f"调度器启动失败: {e}")
 
@@ -244,11 +422,12 @@ def update_sync_interval(minutes: int):
     Args:
         minutes: 新的同步间隔（分钟）
     """
+    if config.SYNC_SCHEDULE_MODE == "calendar":
+        logger.info(f"同步间隔已更新: {minutes} 分钟（calendar 模式下仅用于手动添加动漫的新集搜索）")
+        return
     try:
-        scheduler.reschedule_job(
-            "auto_sync",
-            trigger=IntervalTrigger(minutes=minutes),
-        )
+        # 到期时间按各动漫 last_sync_at 计算，重新安排一次唤醒即可
+        _schedule_next_auto_sync()
         logger.info(f"同步间隔已更新: {minutes} 分钟")
     except Exception as e:
         logger.error(f"更新同步间隔失败: {e}")
@@ -4,12 +4,23 @@
 import json
 import logging
 import re
-from datetime import date
-from typing import Optional
+import time
+from datetime import date, timedelta
+from typing import Callable, NamedTuple, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from app import config
-from app.core.invidious_client import get_invidious_client
-from app.core.matcher.scorer import score_video, source_sort_key
+from app.core.candidate import VideoCandidate
+from app.core.invidious_client import SEARCH_PAGE_SIZE, get_invidious_client
+from app.core.matcher.fuzzy_matcher import CompiledTitleMatcher
+from app.core.matcher.scorer import (
+    CONFIDENCE_TIERS,
+    ParsedTitleCache,
+    ScoringContext,
+    build_title_matcher,
+    is_high_confidence,
+    parse_video_title,
+    score_videos,
+)
 from app.core.matcher.preprocessor import extract_episode_number
 from app.db import database as db
 
@@ -44,12 +55,25 @@ def _is_generic_episode_title(title: str) -> bool:
     ))
 
 
+class KeywordPlan(NamedTuple):
+    """一个搜索关键词及其来源：名称（标题/别名）和关键词模式，用于统计命中率。"""
+    keyword: str
+    name: str
+    pattern: str
+
+
+# 关键词模式
+PATTERN_EPISODE_TITLE = "单集标题"
+PATTERN_CN_EPISODE = "第N集"
+PATTERN_EP = "EPN"
+
+
 def _get_search_keywords(
     anime: dict,
     episode_num: int,
     aliases: list[str] = None,
     episode: Optional[dict] = None,
-) -> list[str]:
+) -> list[KeywordPlan]:
     """
     生成搜索关键词列表
 
@@ -59,7 +83,7 @@ def _get_search_keywords(
         aliases: 已获取的别名列表（避免重复查询）
 
     Returns:
-        关键词列表
+        关键词列表（按历史命中率排列，已剔除长期无产出的关键词模式）
     """
     title = anime.get("title_cn", "")
 
@@ -82,16 +106,73 @@ def _get_search_keywords(
     episode_title = (episode or {}).get("title", "").strip()
     if anime.get("tmdb_id") is not None and episode_title and not _is_generic_episode_title(episode_title):
         for name in search_names:
-            keywords.append(f"{name} {episode_title}")
+            keywords.append(KeywordPlan(f"{name} {episode_title}", name, PATTERN_EPISODE_TITLE))
 
     for name in search_names:
-        keywords.append(f"{name} 第{episode_num}集")
-        keywords.append(f"{name} EP{episode_num}")
+        keywords.append(KeywordPlan(f"{name} 第{episode_num}集", name, PATTERN_CN_EPISODE))
+        keywords.append(KeywordPlan(f"{name} EP{episode_num}", name, PATTERN_EP))
+
+    # 按关键词文本去重，避免重复关键词浪费搜索配额
+    plans = []
+    seen_keywords = set()
+    for item in keywords:
+        keyword = item.keyword.strip()
+        if keyword and keyword.lower() not in seen_keywords:
+            seen_keywords.add(keyword.lower())
+            plans.append(item._replace(keyword=keyword))
+    return _rank_keywords(anime["id"], plans)
+
+
+def _rank_keywords(anime_id: int, plans: list[KeywordPlan]) -> list[KeywordPlan]:
+    """
+    按历史命中率（拉普拉斯平滑）对关键词降序排列；
+    命中率相同或没有历史记录时保持默认优先级。
+
+    只有同一集有关键词找到视频源时才记一次搜索；已搜索 KEYWORD_PRUNE_MIN_ATTEMPTS 次
+    仍从未命中的关键词模式会被剔除，直到距上次搜索超过 KEYWORD_PRUNE_RETRY_DAYS 天
+    再重新尝试；至少保留一个关键词。
+    """
+    stats = db.get_keyword_stats(anime_id)
+    if not stats:
+        return plans
+
+    def hit_rate(item: KeywordPlan) -> float:
+        row = stats.get((item.name, item.pattern))
+        if not row:
+            return 0.5
+        return (row["accepted"] + 1) / (row["attempts"] + 2)
+
+    def exhausted(item: KeywordPlan) -> bool:
+        row = stats.get((item.name, item.pattern))
+        return bool(
+            row
+            and row["accepted"] == 0
+            and row["attempts"] >= config.KEYWORD_PRUNE_MIN_ATTEMPTS
+            and (row["age_days"] or 0) < config.KEYWORD_PRUNE_RETRY_DAYS
+        )
 
-    return _dedupe_keep_order(keywords)
+    ranked = sorted(plans, key=hit_rate, reverse=True)
+    kept = [item for item in ranked if not exhausted(item)] or ranked[:1]
+    if len(kept) < len(ranked):
+        logger.info(f"跳过长期无产出的关键词: {[item.keyword for item in ranked if item not in kept]}")
+    return kept
 
 
-def _apply_source_rules(videos: list[dict], anime_id: int) -> list[dict]:
+def _search_cache_ttl(episode: Optional[dict]) -> int:
+    """
+    按集数播出时间决定搜索结果缓存时长
+
+    播出不久（或播出日期未知）的集数，上传者还在陆续发布，用短 TTL；
+    早已播出的集数搜索结果基本稳定，用长 TTL。
+    """
+    air_date = (episode or {}).get("air_date") or ""
+    recent_since = (date.today() - timedelta(days=config.SEARCH_CACHE_RECENT_DAYS)).isoformat()
+    if air_date and air_date[:10] < recent_since:
+        return config.SEARCH_CACHE_TTL_OLD
+    return config.SEARCH_CACHE_TTL_RECENT
+
+
+def _apply_source_rules(videos: list[VideoCandidate], anime_id: int) -> list[VideoCandidate]:
     """
     应用搜索规则过滤
 
@@ -113,8 +194,8 @@ def _apply_source_rules(videos: list[dict], anime_id: int) -> list[dict]:
 
     filtered = []
     for video in videos:
-        title_lower = video.get("title", "").lower()
-        channel_id = video.get("channel_id", "")
+        title_lower = video.title.lower()
+        channel_id = video.channel_id
 
         # 黑名单频道
         if deny_channels and channel_id in deny_channels:
@@ -137,10 +218,22 @@ def _apply_source_rules(videos: list[dict], anime_id: int) -> list[dict]:
     return filtered
 
 
+def load_anime_aliases(anime: dict) -> list[str]:
+    """获取动漫的自定义别名与全局别名。"""
+    aliases = db.get_aliases(anime["id"])
+    aliases.extend(db.get_global_aliases_by_title(anime.get("title_cn", "")))
+    return aliases
+
+
 def find_sources_for_episode(
     anime_id: int,
     episode_num: int,
     force: bool = False,
+    aliases: Optional[list[str]] = None,
+    matcher: Optional[CompiledTitleMatcher] = None,
+    trusted_channels: Optional[frozenset[str]] = None,
+    parse_cache: Optional[ParsedTitleCache] = None,
+    candidates: Optional[list[VideoCandidate]] = None,
 ) -> list[dict]:
     """
     查找指定集数的视频源
@@ -149,6 +242,12 @@ def find_sources_for_episode(
         anime_id: 动漫 ID
         episode_num: 集数
         force: 是否强制搜索（忽略缓存）
+        aliases: 已获取的别名列表；整部同步时由调用方查询一次后复用
+        matcher: 预编译的标题匹配器；整部同步时由调用方构建一次后复用
+        trusted_channels: 信任频道 ID 集合；整部同步时由调用方加载一次后复用
+        parse_cache: 标题解析缓存；整部同步时各集共用，同一视频只解析一次
+        candidates: 已收集的候选视频（如剧集级搜索按集数分发的结果）；
+            传入时不再按关键词搜索
 
     Returns:
         视频源列表
@@ -178,38 +277,10 @@ def find_sources_for_episode(
             return existing_sources
 
     # 获取别名列表（一次查询，复用于关键词和评分）
-    aliases = db.get_aliases(anime_id)
-    aliases.extend(db.get_global_aliases_by_title(anime["title_cn"]))
-
-    # 生成搜索关键词
-    keywords = _get_search_keywords(anime, episode_num, aliases, episode)
-    logger.info(f"搜索关键词: {keywords}")
-
-    # 并发搜索并收集所有结果
-    all_videos = []
-    seen_ids = set()
-    max_workers = min(max(1, config.SOURCE_SEARCH_WORKERS), len(keywords)) if keywords else 1
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(_search_keyword_videos, keyword): keyword for keyword in keywords}
-        for future in as_completed(futures):
-            keyword = futures[future]
-            try:
-                videos = future.result()
-                logger.info(f"关键词 '{keyword}' 搜索到 {len(videos)} 个视频")
-                for video in videos:
-                    vid = video.get("video_id", "")
-                    if vid and vid not in seen_ids:
-                        seen_ids.add(vid)
-                        all_videos.append(video)
-            except Exception as e:
-                logger.error(f"搜索关键词 '{keyword}' 出错: {type(e).__name__}: {e}")
-
-    logger.info(f"去重后找到 {len(all_videos)} 个候选视频")
-
-    # 应用搜索规则
-    all_videos = _apply_source_rules(all_videos, anime_id)
-    logger.info(f"规则过滤后: {len(all_videos)} 个视频")
+    if aliases is None:
+        aliases = load_anime_aliases(anime)
+    if matcher is None:
+        matcher = parse_cache.matcher if parse_cache else build_title_matcher(anime["title_cn"], aliases)
 
     # 判断是否为手动添加的动漫（使用更低阈值）
     is_manual = anime.get("tmdb_id") is None
@@ -217,93 +288,340 @@ def find_sources_for_episode(
     if is_manual:
         logger.info(f"手动添加动漫，使用宽松阈值: {threshold}")
 
-    # 评分并排序：先硬过滤，再按置信等级和同级质量排序
-    scored_videos = []
-    filtered_count = 0
-    below_threshold_count = 0
-    for video in all_videos:
-        score_result = score_video(
-            video, anime["title_cn"], episode_num, aliases
+    # 批量评分：先硬过滤，再按置信等级和同级质量排序
+    # 置信等级优先；发布时间/播放量/画质只作为同级内排序因素
+    context = ScoringContext(
+        anime["title_cn"],
+        episode_num,
+        aliases,
+        matcher=matcher,
+        min_score=threshold,
+        trusted_channels=trusted_channels,
+        parse_cache=parse_cache,
+    )
+    # 没有可用关键词时不会发生评分，计数保持为 0
+    score_stats: dict[str, int] = {"filtered": 0, "below_threshold": 0, "accepted": 0}
+    if candidates is None:
+        scored_videos = _search_in_waves(
+            anime, episode_num, aliases, episode, context, score_stats, refresh_cache=force
         )
+    else:
+        logger.info(f"使用剧集级搜索结果: {anime['title_cn']} 第{episode_num}集 ({len(candidates)}个候选)")
+        all_videos = _apply_source_rules(candidates, anime_id)
+        logger.info(f"规则过滤后: {len(all_videos)} 个视频")
+        scored_videos = score_videos(all_videos, context, stats=score_stats)
 
-        if score_result["filtered"]:
-            filtered_count += 1
-            logger.debug(f"过滤: '{video.get('title', '')}' - {score_result.get('filter_reason', '')}")
-            continue
+    logger.info(
+        f"评分结果: {len(scored_videos)} 通过, {score_stats['filtered']} 被过滤, "
+        f"{score_stats['below_threshold']} 低于阈值({threshold})"
+    )
 
-        if score_result["total_score"] >= threshold:
-            video["match_score"] = score_result["total_score"]
-            video["score_detail"] = score_result
-            scored_videos.append(video)
-        else:
-            below_threshold_count += 1
-            logger.debug(
-                f"低分: '{video.get('title', '')}' = {score_result['total_score']:.1f} "
-                f"(阈值: {threshold})"
-            )
+    # 强制重新搜索时，搜索流程已完成，此时在同一事务内用新结果替换该集旧视频源
+    max_sources = config.MAX_SOURCES_PER_EPISODE
+    saved_sources = db.replace_episode_sources(
+        episode["id"],
+        [video.to_source_record(episode["id"]) for video in scored_videos[:max_sources]],
+        force=force,
+    )
 
     logger.info(
-        f"评分结果: {len(scored_videos)} 通过, {filtered_count} 被过滤, "
-        f"{below_threshold_count} 低于阈值({threshold})"
+        f"保存 {len(saved_sources)} 个视频源: "
+        f"{anime['title_cn']} 第{episode_num}集"
     )
 
-    # 置信等级优先；发布时间/播放量/画质只作为同级内排序因素
-    scored_videos.sort(key=source_sort_key, reverse=True)
+    return saved_sources
 
-    # 强制重新搜索时，搜索流程已完成，此时用新结果替换该集旧视频源
-    if force:
-        deleted_count = db.delete_sources_for_episode(episode["id"])
-        logger.info(
-            f"强制搜索清理旧视频源: {anime['title_cn']} 第{episode_num}集 "
-            f"({deleted_count}个)"
-        )
 
-    # 保存到数据库
+def _search_in_waves(
+    anime: dict,
+    episode_num: int,
+    aliases: list[str],
+    episode: Optional[dict],
+    context: ScoringContext,
+    score_stats: dict[str, int],
+    refresh_cache: bool = False,
+) -> list[VideoCandidate]:
+    """
+    按历史命中率排序关键词，每批 KEYWORD_WAVE_SIZE 个并发搜索
+
+    每批结束后对累计候选评分，前 MAX_SOURCES_PER_EPISODE 个中已有
+    KEYWORD_TIER_TARGET 个 S/A 级视频源时不再搜索剩余关键词。
+    结束后批量记录各关键词的产出（被采纳数、最高置信等级、耗时），供下次排序和剔除。
+
+    Args:
+        anime: 动漫信息
+        episode_num: 目标集数
+        aliases: 别名列表
+        episode: 集数记录（用于 TMDB 单集标题关键词和缓存时长）
+        context: 评分上下文
+        score_stats: 评分统计，写入最后一次评分的计数
+        refresh_cache: 跳过搜索缓存（强制同步）
+
+    Returns:
+        最后一次评分的结果（已排序）
+    """
+    plans = _get_search_keywords(anime, episode_num, aliases, episode)
+    logger.info(f"搜索关键词: {[item.keyword for item in plans]}")
+    cache_ttl = _search_cache_ttl(episode)
     max_sources = config.MAX_SOURCES_PER_EPISODE
-    for video in scored_videos[:max_sources]:
-        db.add_source({
-            "episode_id": episode["id"],
-            "video_id": video["video_id"],
-            "title": video.get("title", ""),
-            "channel_id": video.get("channel_id", ""),
-            "channel_name": video.get("channel_name", ""),
-            "duration": video.get("duration", 0),
-            "view_count": video.get("view_count", 0),
-            "published_at": video.get("published_at", ""),
-            "match_score": video["match_score"],
+    wave_size = max(1, config.KEYWORD_WAVE_SIZE)
+    tier_target = min(max(1, config.KEYWORD_TIER_TARGET), max(1, max_sources))
+
+    all_videos: list[VideoCandidate] = []
+    seen_ids = set()
+    keyword_video_ids: dict[str, set[str]] = {}
+    keyword_latency: dict[str, float] = {}
+    searched: list[KeywordPlan] = []
+    scored_videos: list[VideoCandidate] = []
+
+    for start in range(0, len(plans), wave_size):
+        wave = plans[start:start + wave_size]
+        results = _search_keywords(
+            [item.keyword for item in wave],
+            cache_ttl,
+            refresh_cache,
+            episode_num,
+            context.matcher,
+            context.parse_cache,
+        )
+        searched.extend(wave)
+
+        new_videos = []
+        for item in wave:
+            videos, keyword_latency[item.keyword] = results.get(item.keyword, ([], 0.0))
+            keyword_video_ids[item.keyword] = {video.video_id for video in videos}
+            for video in videos:
+                vid = video.video_id
+                if vid and vid not in seen_ids:
+                    seen_ids.add(vid)
+                    new_videos.append(video)
+        all_videos.extend(_apply_source_rules(new_videos, anime["id"]))
+
+        scored_videos = score_videos(all_videos, context, stats=score_stats)
+        confident = sum(1 for video in scored_videos[:max_sources] if video.confidence_tier in ("S", "A"))
+        remaining = len(plans) - start - len(wave)
+        if confident >= tier_target and remaining > 0:
+            logger.info(
+                f"已有 {confident} 个 S/A 级视频源，跳过剩余 {remaining} 个关键词: "
+                f"{anime['title_cn']} 第{episode_num}集"
+            )
+            break
+
+    logger.info(f"去重并规则过滤后共 {len(all_videos)} 个候选视频")
+
+    accepted_ids = {video.video_id for video in scored_videos[:max_sources]}
+    if not accepted_ids:
+        # 本集还没有任何可用上传（例如刚开播），无法说明哪个关键词无效，不计入命中统计，
+        # 否则开播前同步过的动漫会把大部分关键词误判为长期无产出而剔除
+        return scored_videos
+    tiers = {video.video_id: video.confidence_tier for video in scored_videos}
+    keyword_results = []
+    for item in searched:
+        video_ids = keyword_video_ids.get(item.keyword, set())
+        best_tier = max(
+            (tiers[vid] for vid in video_ids if vid in tiers),
+            key=lambda tier: CONFIDENCE_TIERS[tier]["rank"],
+            default="",
+        )
+        keyword_results.append({
+            "name": item.name,
+            "pattern": item.pattern,
+            "sources": len(video_ids & accepted_ids),
+            "best_tier": best_tier,
+            "best_tier_rank": CONFIDENCE_TIERS[best_tier]["rank"] if best_tier else 0,
+            "latency_ms": round(keyword_latency.get(item.keyword, 0.0), 1),
         })
+    try:
+        db.record_keyword_results(anime["id"], keyword_results)
+    except Exception as e:
+        logger.warning(f"记录关键词命中统计失败: {e}")
+    return scored_videos
+
+
+def _search_keywords(
+    keywords: list[str],
+    cache_ttl: int,
+    refresh_cache: bool,
+    episode_num: int,
+    matcher: CompiledTitleMatcher,
+    parse_cache: Optional[ParsedTitleCache] = None,
+) -> dict[str, tuple[list[VideoCandidate], float]]:
+    """
+    并发搜索一批关键词；每个关键词凑够高置信候选后即停止翻页
+
+    Returns:
+        关键词 → (搜索结果, 耗时毫秒)，出错的关键词不在结果中
+    """
+    results: dict[str, tuple[list[VideoCandidate], float]] = {}
+    if not keywords:
+        return results
+    max_workers = min(max(1, config.SOURCE_SEARCH_WORKERS), len(keywords))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                _search_keyword_timed,
+                keyword,
+                cache_ttl,
+                refresh_cache,
+                _episode_satisfied(episode_num, matcher, parse_cache),
+            ): keyword
+            for keyword in keywords
+        }
+        for future in as_completed(futures):
+            keyword = futures[future]
+            try:
+                videos, latency_ms = results[keyword] = future.result()
+                logger.info(f"关键词 '{keyword}' 搜索到 {len(videos)} 个视频 ({latency_ms:.0f}ms)")
+            except Exception as e:
+                logger.error(f"搜索关键词 '{keyword}' 出错: {type(e).__name__}: {e}")
+    return results
+
+
+def harvest_show_candidates(
+    anime: dict,
+    aliases: list[str],
+    parse_cache: Optional[ParsedTitleCache] = None,
+    refresh_cache: bool = False,
+) -> dict[int, list[VideoCandidate]]:
+    """
+    剧集级搜索：只用名称/别名（不带集数）按相关性和日期分页搜索，
+    把结果按标题中的集数分发到各集
 
-    # 循环结束后统一查询一次
-    saved_sources = db.get_sources_for_episode(episode["id"])
+    一次名称搜索往往覆盖很多集，批量补源时比逐集搜索少得多的请求。
+    识别不出集数的视频不分发，留给逐集搜索。
+
+    Args:
+        anime: 动漫信息
+        aliases: 别名列表
+        parse_cache: 标题解析缓存；传入时集数识别结果与后续评分共用
+        refresh_cache: 跳过搜索缓存（强制同步）
+
+    Returns:
+        集数 → 候选视频列表
+    """
+    names = _dedupe_keep_order([anime.get("title_cn", "")] + aliases)[:max(1, config.SHOW_HARVEST_NAMES_LIMIT)]
+    pages = max(1, config.SHOW_HARVEST_PAGES)
+    searches = [(name, sort_by) for name in names for sort_by in ("relevance", "date")]
+
+    seen_ids = set()
+    buckets: dict[int, list[VideoCandidate]] = {}
+    max_workers = min(max(1, config.SOURCE_SEARCH_WORKERS), len(searches))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                get_invidious_client().search_videos_deep,
+                name,
+                max_results=pages * SEARCH_PAGE_SIZE,
+                sort_by=sort_by,
+                refresh_cache=refresh_cache,
+                max_pages=pages,
+            ): (name, sort_by)
+            for name, sort_by in searches
+        }
+        for future in as_completed(futures):
+            name, sort_by = futures[future]
+            try:
+                videos = future.result()
+            except Exception as e:
+                logger.error(f"剧集级搜索 '{name}' ({sort_by}) 出错: {type(e).__name__}: {e}")
+                continue
+            for video in videos:
+                vid = video.video_id
+                if not vid or vid in seen_ids:
+                    continue
+                seen_ids.add(vid)
+                if parse_cache:
+                    ep = parse_cache.get(vid, video.title, video.duration).numbers.episode
+                else:
+                    ep = extract_episode_number(video.title)
+                if ep is not None and ep > 0:
+                    buckets.setdefault(ep, []).append(video)
 
     logger.info(
-        f"保存 {len(scored_videos[:max_sources])} 个视频源: "
-        f"{anime['title_cn']} 第{episode_num}集"
+        f"剧集级搜索: {anime.get('title_cn', '')} 名称 {len(names)} 个, "
+        f"候选 {len(seen_ids)} 个, 覆盖 {len(buckets)} 集"
     )
-
-    return saved_sources
+    return buckets
 
 
-def _search_keyword_videos(keyword: str) -> list[dict]:
+def _search_keyword_videos(
+    keyword: str,
+    cache_ttl: Optional[int] = None,
+    refresh_cache: bool = False,
+    stop_when: Optional[Callable[[list[VideoCandidate]], bool]] = None,
+) -> list[VideoCandidate]:
     """
-    搜索单个关键词的视频列表
+    搜索单个关键词的视频列表（多页，直到 MAX_SEARCH_RESULTS 或 stop_when 满足）
 
     Args:
         keyword: 搜索关键词
+        cache_ttl: 搜索结果缓存时长（秒）
+        refresh_cache: 跳过搜索缓存
+        stop_when: 翻页提前停止判定
 
     Returns:
-        视频列表
+        候选视频列表
     """
-    return get_invidious_client().search_videos(keyword, max_results=config.MAX_SEARCH_RESULTS)
+    return get_invidious_client().search_videos_deep(
+        keyword,
+        max_results=config.MAX_SEARCH_RESULTS,
+        cache_ttl=cache_ttl,
+        refresh_cache=refresh_cache,
+        stop_when=stop_when,
+    )
 
 
-def should_sync_episode(episode: dict, mode: str = "incremental") -> tuple[bool, str]:
+def _search_keyword_timed(
+    keyword: str,
+    cache_ttl: Optional[int] = None,
+    refresh_cache: bool = False,
+    stop_when: Optional[Callable[[list[VideoCandidate]], bool]] = None,
+) -> tuple[list[VideoCandidate], float]:
+    """_search_keyword_videos 并返回耗时（毫秒），用于关键词统计"""
+    started = time.monotonic()
+    videos = _search_keyword_videos(keyword, cache_ttl, refresh_cache, stop_when)
+    return videos, (time.monotonic() - started) * 1000
+
+
+def _episode_satisfied(
+    episode_num: int,
+    matcher: CompiledTitleMatcher,
+    parse_cache: Optional[ParsedTitleCache] = None,
+) -> Callable[[list[VideoCandidate]], bool]:
+    """
+    构建单个关键词的翻页停止判定：累计到 MAX_SOURCES_PER_EPISODE 个
+    高置信（至少 A 级）候选后不再翻页。判定带计数状态，每个关键词各建一个。
+    """
+    target = max(1, config.MAX_SOURCES_PER_EPISODE)
+    found = 0
+
+    def stop_when(page_videos: list[VideoCandidate]) -> bool:
+        nonlocal found
+        for video in page_videos:
+            if parse_cache:
+                parsed = parse_cache.get(video.video_id, video.title, video.duration)
+            else:
+                parsed = parse_video_title(video.title, video.duration, matcher)
+            if is_high_confidence(parsed, episode_num):
+                found += 1
+        return found >= target
+
+    return stop_when
+
+
+def should_sync_episode(
+    episode: dict,
+    mode: str = "incremental",
+    missing_ids: Optional[set[int]] = None,
+) -> tuple[bool, str]:
     """
     判断单集是否需要同步视频源
 
     Args:
         episode: 集数记录
         mode: 同步模式，incremental 表示增量，full 表示全量
+        missing_ids: 已批量查出的无有效视频源集数 ID（db.get_episode_ids_without_sources）；
+                     不传时逐集查询
 
     Returns:
         是否同步和原因
@@ -311,6 +629,11 @@ def should_sync_episode(episode: dict, mode: str = "incremental") -> tuple[bool,
     if mode == "full":
         return True, "full"
 
+    if missing_ids is not None:
+        if episode["id"] in missing_ids:
+            return True, "missing"
+        return False, "cached"
+
     sources = db.get_sources_for_episode(episode["id"])
     if not sources:
         return True, "missing"
@@ -342,8 +665,7 @@ def discover_latest_episode(anime_id: int) -> int:
         return 0
 
     title = anime.get("title_cn", "")
-    aliases = db.get_aliases(anime_id)
-    aliases.extend(db.get_global_aliases_by_title(title))
+    aliases = load_anime_aliases(anime)
 
     # 搜索名称（不带集数）
     search_terms = [title] + aliases[:3]
@@ -354,16 +676,16 @@ def discover_latest_episode(anime_id: int) -> int:
             continue
         try:
             # 按相关性搜索
-            videos = get_invidious_client().search_videos(term, max_results=50)
+            videos = get_invidious_client().search_videos_deep(term, max_results=50)
             for video in videos:
-                ep = extract_episode_number(video.get("title", ""))
+                ep = extract_episode_number(video.title)
                 if ep is not None and ep > max_ep:
                     max_ep = ep
 
             # 按日期搜索（更容易找到最新集数）
-            videos_by_date = get_invidious_client().search_videos(term, max_results=30, sort_by="date")
+            videos_by_date = get_invidious_client().search_videos_deep(term, max_results=30, sort_by="date")
             for video in videos_by_date:
-                ep = extract_episode_number(video.get("title", ""))
+                ep = extract_episode_number(video.title)
                 if ep is not None and ep > max_ep:
                     max_ep = ep
         except Exception as e:
@@ -378,7 +700,7 @@ def discover_latest_episode(anime_id: int) -> int:
                 videos = get_invidious_client().search_videos(keyword, max_results=5)
                 found = False
                 for video in videos:
-                    ep = extract_episode_number(video.get("title", ""))
+                    ep = extract_episode_number(video.title)
                     if ep is not None and ep == target_ep:
                         max_ep = target_ep
                         found = True
@@ -2,37 +2,76 @@
 追漫阁 - 同步任务队列
 
 轻量级进程内队列，解决同一部动漫重复同步和手动请求阻塞问题。
+开启 SYNC_TASK_JOURNAL_ENABLED 后任务写入 SQLite 日志，重启后从断点恢复。
 """
 import copy
+import heapq
+import itertools
 import logging
-import queue
 import threading
+import time
 import uuid
 from collections import deque
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
 from app import config
+from app.core.metrics import SYNC_QUEUE_DEPTH, SYNC_QUEUE_WAIT_SECONDS
 from app.core.sync_service import normalize_sync_mode, run_anime_sync
+from app.db import database as db
 
 logger = logging.getLogger(__name__)
 
 EVENT_BUFFER_SIZE = 300
 
+# 优先级（数值越小越先执行）：用户手动（不论增量/全量） > 近期新开播 > 常规增量 > 后台全量重扫
+PRIORITY_MANUAL = 0
+PRIORITY_FRESH = 1
+PRIORITY_INCREMENTAL = 2
+PRIORITY_FULL = 3
+PRIORITY_NAMES = {
+    PRIORITY_MANUAL: "manual",
+    PRIORITY_FRESH: "fresh",
+    PRIORITY_INCREMENTAL: "incremental",
+    PRIORITY_FULL: "full",
+}
+
+
+def default_priority(mode: str, sync_type: str) -> int:
+    """未指定优先级时按来源和同步模式推断：用户手动发起的同步（含全量）一律最先执行，
+    全量优先级只用于后台定时/批量的全量重扫"""
+    if sync_type == "manual":
+        return PRIORITY_MANUAL
+    if normalize_sync_mode(mode) == "full":
+        return PRIORITY_FULL
+    return PRIORITY_INCREMENTAL
+
 
 class SyncTask:
     """单个同步任务的内存状态。"""
 
-    def __init__(self, anime_id: int, mode: str, sync_type: str = "manual"):
-        self.id = uuid.uuid4().hex
+    def __init__(
+        self,
+        anime_id: int,
+        mode: str,
+        sync_type: str = "manual",
+        priority: int = PRIORITY_MANUAL,
+        task_id: Optional[str] = None,
+        completed_eps: Optional[set[int]] = None,
+    ):
+        self.id = task_id or uuid.uuid4().hex
         self.anime_id = anime_id
         self.mode = normalize_sync_mode(mode)
         self.sync_type = sync_type
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
         self.status = "queued"
         self.created_at = datetime.now().isoformat(timespec="seconds")
         self.started_at = ""
         self.finished_at = ""
         self.error = ""
+        # 从日志恢复的任务：中断前已完成的集数
+        self.completed_eps: set[int] = set(completed_eps or ())
         self.result: Optional[dict[str, Any]] = None
         self.events: deque[dict[str, Any]] = deque(maxlen=EVENT_BUFFER_SIZE)
         self._event_seq = 0
@@ -44,6 +83,7 @@ class SyncTask:
             "anime_id": self.anime_id,
             "mode": self.mode,
             "sync_type": self.sync_type,
+            "priority": PRIORITY_NAMES.get(self.priority, str(self.priority)),
             "status": self.status,
             "created_at": self.created_at,
             "started_at": self.started_at,
@@ -66,7 +106,12 @@ class SyncTask:
 
 
 class SyncQueue:
-    """线程安全的同步队列。"""
+    """
+    线程安全的同步优先级队列。
+
+    排序键为「入队时间 + 优先级 × SYNC_QUEUE_AGING_SECONDS」：高优先级任务插到前面，
+    低优先级任务等待越久越靠前，不会被持续涌入的高优先级任务饿死。
+    """
 
     def __init__(
         self,
@@ -74,7 +119,9 @@ class SyncQueue:
         autostart: bool = True,
         task_retention_seconds: Optional[int] = None,
     ):
-        self._queue: queue.Queue[str] = queue.Queue()
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._not_empty = threading.Condition()
         self._tasks: dict[str, SyncTask] = {}
         self._active_by_anime: dict[int, str] = {}
         self._lock = threading.Lock()
@@ -102,26 +149,94 @@ class SyncQueue:
             thread.start()
         logger.info(f"同步任务队列已启动，worker_count={self._worker_count}")
 
-    def enqueue(self, anime_id: int, mode: str = "incremental", sync_type: str = "manual") -> tuple[SyncTask, bool]:
-        """提交任务；同一动漫已有排队/运行任务时返回现有任务。"""
+    def enqueue(
+        self,
+        anime_id: int,
+        mode: str = "incremental",
+        sync_type: str = "manual",
+        priority: Optional[int] = None,
+    ) -> tuple[SyncTask, bool]:
+        """
+        提交任务；同一动漫已有排队/运行任务时返回现有任务。
+
+        priority 默认按模式和来源推断（见 default_priority）；已在排队的任务
+        以更高优先级再次提交时会提升其优先级（例如用户手动同步正在排队的自动同步任务）。
+        """
         if self._autostart:
             self.start()
         normalized_mode = normalize_sync_mode(mode)
+        if priority is None:
+            priority = default_priority(normalized_mode, sync_type)
         with self._lock:
             self._cleanup_completed_tasks_locked()
             existing_id = self._active_by_anime.get(anime_id)
             if existing_id:
                 existing = self._tasks.get(existing_id)
                 if existing and existing.status in {"queued", "running"}:
+                    if existing.status == "queued" and priority < existing.priority:
+                        self._reprioritize_locked(existing, priority)
                     return existing, False
 
-            task = SyncTask(anime_id=anime_id, mode=normalized_mode, sync_type=sync_type)
+            task = SyncTask(anime_id=anime_id, mode=normalized_mode, sync_type=sync_type, priority=priority)
             self._tasks[task.id] = task
             self._active_by_anime[anime_id] = task.id
-            self._queue.put(task.id)
+            self._journal(task)
+            self._push(task)
             task.add_event({"type": "queued", "message": "同步任务已加入队列"})
             return task, True
 
+    def resume_journal(self) -> int:
+        """
+        恢复上次运行中断的任务（SYNC_TASK_JOURNAL_ENABLED 开启时），返回恢复的任务数。
+
+        恢复的任务沿用原任务 ID 和日志记录，跳过中断前已完成的集数；再次中断时断点仍然有效。
+        """
+        if not config.SYNC_TASK_JOURNAL_ENABLED:
+            return 0
+        try:
+            interrupted = db.get_interrupted_sync_tasks()
+        except Exception as e:
+            logger.error(f"读取同步任务日志失败: {e}")
+            return 0
+        if self._autostart and interrupted:
+            self.start()
+
+        resumed = 0
+        with self._lock:
+            for row in interrupted:
+                if row["anime_id"] in self._active_by_anime or row["task_id"] in self._tasks:
+                    db.finish_journal_sync_task(row["task_id"])
+                    continue
+                task = SyncTask(
+                    anime_id=row["anime_id"],
+                    mode=row["mode"],
+                    sync_type=row["sync_type"],
+                    priority=row["priority"],
+                    task_id=row["task_id"],
+                    completed_eps=row["completed_eps"],
+                )
+                self._tasks[task.id] = task
+                self._active_by_anime[task.anime_id] = task.id
+                self._push(task)
+                task.add_event({
+                    "type": "queued",
+                    "message": f"从断点恢复同步任务，已完成 {len(task.completed_eps)} 集",
+                })
+                resumed += 1
+        if resumed:
+            logger.info(f"已从同步任务日志恢复 {resumed} 个中断的任务")
+        return resumed
+
+    def queue_depths(self) -> dict[str, int]:
+        """各优先级排队中的任务数"""
+        with self._lock:
+            depths = {name: 0 for name in PRIORITY_NAMES.values()}
+            for task in self._tasks.values():
+                if task.status == "queued":
+                    name = PRIORITY_NAMES.get(task.priority, str(task.priority))
+                    depths[name] = depths.get(name, 0) + 1
+            return depths
+
     def get_task(self, task_id: str) -> Optional[SyncTask]:
         with self._lock:
             self._cleanup_completed_tasks_locked()
@@ -147,26 +262,61 @@ class SyncQueue:
         with self._lock:
             return self._cleanup_completed_tasks_locked()
 
-    def _worker_loop(self) -> None:
+    def _journal(self, task: SyncTask) -> None:
+        if config.SYNC_TASK_JOURNAL_ENABLED:
+            db.journal_sync_task(task.id, task.anime_id, task.mode, task.sync_type, task.priority)
+
+    def _push(self, task: SyncTask) -> None:
+        key = task.enqueued_at + task.priority * max(0, config.SYNC_QUEUE_AGING_SECONDS)
+        with self._not_empty:
+            heapq.heappush(self._heap, (key, next(self._seq), task.id))
+            self._not_empty.notify()
+        SYNC_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES.get(task.priority, str(task.priority))).inc()
+
+    def _reprioritize_locked(self, task: SyncTask, priority: int) -> None:
+        """提升排队中任务的优先级：压入新排序键，旧条目出队时因任务已不在排队状态而被忽略"""
+        SYNC_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES.get(task.priority, str(task.priority))).dec()
+        task.priority = priority
+        self._journal(task)
+        self._push(task)
+        task.add_event({"type": "queued", "message": "同步任务优先级已提升"})
+
+    def _next_task(self) -> SyncTask:
+        """阻塞取出排序键最小、仍在排队的任务并标记为运行中"""
         while True:
-            task_id = self._queue.get()
-            task = self.get_task(task_id)
-            if not task:
-                self._queue.task_done()
-                continue
+            with self._not_empty:
+                while not self._heap:
+                    self._not_empty.wait()
+                _, _, task_id = heapq.heappop(self._heap)
+            with self._lock:
+                task = self._tasks.get(task_id)
+                # 已提升优先级的任务会留下重复条目，只执行一次
+                if not task or task.status != "queued":
+                    continue
+                task.status = "running"
+            priority_name = PRIORITY_NAMES.get(task.priority, str(task.priority))
+            SYNC_QUEUE_DEPTH.labels(priority=priority_name).dec()
+            SYNC_QUEUE_WAIT_SECONDS.labels(priority=priority_name).observe(time.monotonic() - task.enqueued_at)
+            return task
 
-            try:
-                self._run_task(task)
-            finally:
-                self._queue.task_done()
+    def _worker_loop(self) -> None:
+        while True:
+            task = self._next_task()
+            self._run_task(task)
 
     def _run_task(self, task: SyncTask) -> None:
         task.status = "running"
         task.started_at = datetime.now().isoformat(timespec="seconds")
         task.add_event({"type": "task_start", "message": "同步任务开始执行"})
+        journal = config.SYNC_TASK_JOURNAL_ENABLED
+        if journal:
+            db.journal_sync_task_status(task.id, "running")
 
         def emit(event: dict[str, Any]) -> None:
             task.add_event(event)
+            # 搜索出错的集数不记断点，恢复时重新同步
+            if journal and event.get("type") == "episode" and not event.get("error"):
+                db.journal_sync_episode(task.id, event["ep_num"])
 
         try:
             result = run_anime_sync(
@@ -174,6 +324,7 @@ class SyncQueue:
                 mode=task.mode,
                 sync_type=task.sync_type,
                 emit=emit,
+                skip_episodes=task.completed_eps,
             )
             task.result = result
             task.status = "success" if result.get("success") else "error"
@@ -186,6 +337,8 @@ class SyncQueue:
             task.error = str(e)
             task.add_event({"type": "error", "message": str(e)})
         finally:
+            if journal:
+                db.finish_journal_sync_task(task.id)
             task.finished_at = datetime.now().isoformat(timespec="seconds")
             task.add_event({
                 "type": "task_done",
@@ -212,4 +365,4 @@ class SyncQueue:
         return len(expired_ids)
 
 
-sync_queue = SyncQueue(worker_count=1)
+sync_queue = SyncQueue(worker_count=config.SYNC_QUEUE_WORKERS)
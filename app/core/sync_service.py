@@ -12,8 +12,12 @@ from app import config
 from app.core.source_finder import (
     discover_latest_episode,
     find_sources_for_episode,
+    harvest_show_candidates,
+    load_anime_aliases,
     should_sync_episode,
 )
+from app.core.matcher.preprocessor import get_normalize_cache_stats, normalize_text
+from app.core.matcher.scorer import ParsedTitleCache, build_title_matcher
 from app.core.tmdb_client import get_tmdb_client
 from app.db import database as db
 
@@ -28,11 +32,40 @@ def normalize_sync_mode(mode: str) -> str:
     return mode if mode in {"incremental", "full"} else "incremental"
 
 
+def needs_auto_sync(anime: dict, plan: Optional[dict], refresh_hours: float) -> tuple[bool, str]:
+    """
+    判断自动（增量）同步是否有事可做，避免为无缺源集数的动漫排队同步任务
+
+    Args:
+        anime: 动漫信息
+        plan: db.get_library_sync_plan 中该动漫的条目
+        refresh_hours: 没有缺源集数的连载中 TMDB 动漫，距上次同步超过该小时数即重新同步
+                       （刷新 TMDB 集数）；调用方传入该动漫自己的同步间隔
+
+    Returns:
+        是否需要同步和原因
+    """
+    if plan is None:
+        return True, "unplanned"
+    if plan["missing_count"] > 0:
+        return True, "missing"
+    # 手动添加的动漫靠搜索发现新集，每次都需要同步
+    if anime.get("tmdb_id") is None:
+        return True, "discover"
+    if anime.get("status") in ("Ended", "Canceled"):
+        return False, "complete"
+    hours = plan["hours_since_sync"]
+    if hours is None or hours >= refresh_hours:
+        return True, "refresh"
+    return False, "up_to_date"
+
+
 def run_anime_sync(
     anime_id: int,
     mode: str = "incremental",
     sync_type: str = "manual",
     emit: Optional[SyncEmitter] = None,
+    skip_episodes: Optional[set[int]] = None,
 ) -> dict[str, Any]:
     """
     同步一部动漫的视频源。
@@ -42,6 +75,7 @@ def run_anime_sync(
         mode: incremental 或 full
         sync_type: manual / auto 等同步来源，用于日志
         emit: 可选事件回调，SSE 和队列用它推送实时进度
+        skip_episodes: 已在中断前完成的集数，恢复任务时跳过
 
     Returns:
         同步结果字典
@@ -75,8 +109,12 @@ def run_anime_sync(
         sync_items: list[tuple[dict, str]] = []
         skipped = 0
         skip_reasons: dict[str, int] = {"cached": 0}
+        missing_ids = db.get_episode_ids_without_sources(anime_id) if mode == "incremental" else None
         for ep in episodes:
-            should_sync, reason = should_sync_episode(ep, mode)
+            if skip_episodes and ep["absolute_num"] in skip_episodes:
+                should_sync, reason = False, "resumed"
+            else:
+                should_sync, reason = should_sync_episode(ep, mode, missing_ids)
             if should_sync:
                 sync_items.append((ep, reason))
             else:
@@ -102,24 +140,57 @@ def run_anime_sync(
             f"待同步={len(sync_items)}, 跳过={skipped}"
         )
 
-        def _sync_one(ep: dict, reason: str) -> tuple[int, int, str]:
-            ep_num = ep["absolute_num"]
+        # 名称归一化、别名和标题匹配器按动漫构建一次，整次同步的所有集数共用
+        anime["normalized_title"] = normalize_text(anime["title_cn"])
+        aliases = load_anime_aliases(anime)
+        matcher = build_title_matcher(
+            anime["title_cn"],
+            aliases,
+            normalized_title=anime["normalized_title"],
+        )
+        trusted_channels = db.get_trusted_channel_ids()
+        # 同一视频常在多个关键词和相邻集数的结果中出现，标题只解析一次
+        parse_cache = ParsedTitleCache(matcher)
+
+        # 待同步集数较多时先做一次剧集级搜索，按集数分发候选，避免逐集各搜一轮
+        harvested: dict[int, list] = {}
+        if config.SHOW_HARVEST_MIN_EPISODES > 0 and len(sync_items) >= config.SHOW_HARVEST_MIN_EPISODES:
+            _emit(emit, {"type": "discovering", "message": "正在进行剧集级搜索..."})
             try:
-                sources = find_sources_for_episode(
-                    anime_id,
-                    ep_num,
-                    force=(mode == "full"),
+                harvested = harvest_show_candidates(
+                    anime, aliases, parse_cache, refresh_cache=(mode == "full")
                 )
-                return ep_num, len(sources) if sources else 0, reason
+            except Exception as e:
+                logger.warning(f"剧集级搜索失败，回退逐集搜索: {anime['title_cn']} - {e}")
+
+        def _sync_one(ep: dict, reason: str) -> tuple[int, int, str, str]:
+            ep_num = ep["absolute_num"]
+            try:
+                options = {
+                    "force": mode == "full",
+                    "aliases": aliases,
+                    "matcher": matcher,
+                    "trusted_channels": trusted_channels,
+                    "parse_cache": parse_cache,
+                }
+                sources = None
+                if harvested.get(ep_num):
+                    sources = find_sources_for_episode(
+                        anime_id, ep_num, candidates=harvested[ep_num], **options
+                    )
+                # 剧集级结果没有可用源时，回退到逐集关键词搜索
+                if not sources:
+                    sources = find_sources_for_episode(anime_id, ep_num, **options)
+                return ep_num, len(sources) if sources else 0, reason, ""
             except Exception as e:
                 logger.error(f"同步失败: {anime['title_cn']} 第{ep_num}集 - {e}")
-                return ep_num, 0, reason
+                return ep_num, 0, reason, str(e)
 
         max_workers = min(max(1, config.EPISODE_SYNC_WORKERS), len(sync_items)) if sync_items else 1
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {executor.submit(_sync_one, ep, reason): ep for ep, reason in sync_items}
             for future in as_completed(futures):
-                ep_num, source_count, reason = future.result()
+                ep_num, source_count, reason, error = future.result()
                 done_count += 1
                 if source_count > 0:
                     synced += 1
@@ -137,9 +208,20 @@ def run_anime_sync(
                     "ep_num": ep_num,
                     "source_count": source_count,
                     "reason": reason,
+                    "error": error,
                 })
 
         db.touch_anime_sync(anime_id)
+        cache_stats = get_normalize_cache_stats()
+        logger.info(
+            f"归一化缓存: 命中={cache_stats['hits']}, 未命中={cache_stats['misses']}, "
+            f"命中率={cache_stats['hit_rate']:.1%}, 容量={cache_stats['size']}/{cache_stats['max_size']}"
+        )
+        parse_stats = parse_cache.stats()
+        logger.info(
+            f"标题解析缓存: 命中={parse_stats['hits']}, 未命中={parse_stats['misses']}, "
+            f"命中率={parse_stats['hit_rate']:.1%}, 视频数={parse_stats['size']}"
+        )
 
         poster_url = ""
         if is_manual:
@@ -1,15 +1,20 @@
 """
 追漫阁 - 数据库模块
 """
+import json
 import sqlite3
 import os
 import logging
+import queue
 import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from app import config
+from app.core.metrics import DB_POOL_CONNECTIONS, DB_POOL_EVENTS
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +27,38 @@ _ANIME_UPDATABLE_FIELDS = frozenset({
     "last_sync_at",
 })
 
-# 简易连接池（线程安全）
-_connection_pool: list[sqlite3.Connection] = []
-_pool_lock = threading.Lock()
-_POOL_MAX_SIZE = 5
+# 连接池（线程安全）：空闲连接优先交还给上次使用它的线程（语句缓存更热）；
+# 取用时不做探活，只有连接上出现过异常时才在归还时校验
+_pool_cond = threading.Condition()
+_idle_by_thread: dict[int, sqlite3.Connection] = {}
+_idle_connections: list[sqlite3.Connection] = []
+_pool_open = 0
+
+# 信任频道内存索引（表极少变更）：trusted_channels 的任何写入都会经触发器递增库内版本号，
+# 读取时版本号变化才重新加载
+_trusted_channel_lock = threading.Lock()
+_trusted_channel_ids: Optional[frozenset[str]] = None
+_trusted_channel_version = -1
+
+# 设置快照（读多写少：读取只查字典；set_setting 原地更新快照、递增版本号并通知监听者）
+_settings_lock = threading.Lock()
+_settings_snapshot: Optional[dict[str, str]] = None
+_settings_loaded_at = 0.0
+_settings_version = 0
+_settings_listeners: list[Callable[[set[str]], None]] = []
 
 
 def _create_connection() -> sqlite3.Connection:
     """创建新的数据库连接"""
     # timeout：连接层获取写锁的等待秒数；配合 PRAGMA busy_timeout 双重保险，
     # 避免并发同步（EPISODE_SYNC_WORKERS × SOURCE_SEARCH_WORKERS）触发 database is locked。
-    conn = sqlite3.connect(get_db_path(), check_same_thread=False, timeout=30)
+    # 同步路径上的高频写入已交给单写线程（_DbWriter），这里主要兜底其余低频写入。
+    conn = sqlite3.connect(
+        get_db_path(),
+        check_same_thread=False,
+        timeout=30,
+        cached_statements=max(0, config.DB_CACHED_STATEMENTS),
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA busy_timeout=30000")
@@ -40,46 +66,282 @@ def _create_connection() -> sqlite3.Connection:
     return conn
 
 
+def _pool_size() -> int:
+    """常驻连接数；未配置时按持续访问数据库的同步线程数计算（队列 worker × 集数并发，
+    另留 4 个给 Web 请求），并以 DB_POOL_MAX_SIZE 封顶。
+
+    关键词/翻页线程只偶尔读一次搜索缓存，用完即还，写操作全部经单写线程，
+    不按它们的并发数预留连接。连接按需创建，空闲时不会占满这个数量"""
+    if config.DB_POOL_SIZE > 0:
+        return config.DB_POOL_SIZE
+    sync_threads = max(1, config.SYNC_QUEUE_WORKERS) * max(1, config.EPISODE_SYNC_WORKERS)
+    return min(max(5, sync_threads + 4), max(5, config.DB_POOL_MAX_SIZE))
+
+
 def _get_pooled_connection() -> sqlite3.Connection:
-    """从连接池获取连接"""
-    with _pool_lock:
-        if _connection_pool:
-            conn = _connection_pool.pop()
-            # 验证连接是否可用
-            try:
-                conn.execute("SELECT 1")
+    """从连接池获取连接；连接用尽时等待归还，超过 DB_POOL_TIMEOUT 后临时新建"""
+    global _pool_open
+    ident = threading.get_ident()
+    deadline = None
+    with _pool_cond:
+        while True:
+            conn = _idle_by_thread.pop(ident, None)
+            if conn is None and _idle_connections:
+                conn = _idle_connections.pop()
+            if conn is None and _idle_by_thread:
+                # 借用其他线程（可能已退出）留下的连接
+                conn = _idle_by_thread.pop(next(iter(_idle_by_thread)))
+            if conn is not None:
+                DB_POOL_EVENTS.labels(event="checkout").inc()
                 return conn
-            except sqlite3.Error:
-                pass
-    return _create_connection()
+            if _pool_open < _pool_size():
+                break
+            if deadline is None:
+                DB_POOL_EVENTS.labels(event="wait").inc()
+                deadline = time.monotonic() + config.DB_POOL_TIMEOUT
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # 超时仍无连接归还（例如线程嵌套取连接），临时超额新建，归还时关闭
+                break
+            _pool_cond.wait(remaining)
+        _pool_open += 1
+        DB_POOL_CONNECTIONS.set(_pool_open)
+    try:
+        conn = _create_connection()
+    except Exception:
+        with _pool_cond:
+            _pool_open -= 1
+            DB_POOL_CONNECTIONS.set(_pool_open)
+            _pool_cond.notify()
+        raise
+    DB_POOL_EVENTS.labels(event="create").inc()
+    DB_POOL_EVENTS.labels(event="checkout").inc()
+    return conn
 
 
-def _return_connection(conn: sqlite3.Connection) -> None:
-    """归还连接到连接池"""
-    with _pool_lock:
-        if len(_connection_pool) < _POOL_MAX_SIZE:
-            try:
-                conn.rollback()  # 确保没有未提交的事务
-                _connection_pool.append(conn)
-                return
-            except sqlite3.Error:
-                pass
-    # 池满或连接异常，直接关闭
+def _return_connection(conn: sqlite3.Connection, had_error: bool = False) -> None:
+    """归还连接到连接池；使用中出过异常的连接先校验，不可用则关闭"""
+    if had_error or conn.in_transaction:
+        try:
+            conn.rollback()  # 确保没有未提交的事务
+            if had_error:
+                conn.execute("SELECT 1")
+        except sqlite3.Error:
+            _discard_connection(conn)
+            return
+    with _pool_cond:
+        if _pool_open <= _pool_size():
+            ident = threading.get_ident()
+            if ident not in _idle_by_thread:
+                _idle_by_thread[ident] = conn
+            else:
+                _idle_connections.append(conn)
+            _pool_cond.notify()
+            return
+    # 超额临时连接，直接关闭
+    _discard_connection(conn)
+
+
+def _discard_connection(conn: sqlite3.Connection) -> None:
+    """关闭连接并从连接池计数中移除"""
+    global _pool_open
     try:
         conn.close()
     except sqlite3.Error:
         pass
+    with _pool_cond:
+        _pool_open = max(0, _pool_open - 1)
+        DB_POOL_CONNECTIONS.set(_pool_open)
+        _pool_cond.notify()
+    DB_POOL_EVENTS.labels(event="discard").inc()
 
 
 def close_connection_pool() -> None:
     """关闭连接池中的空闲连接，主要用于测试和进程退出清理。"""
-    with _pool_lock:
-        while _connection_pool:
-            conn = _connection_pool.pop()
+    stop_db_writer()
+    with _pool_cond:
+        idle = list(_idle_by_thread.values()) + _idle_connections
+        _idle_by_thread.clear()
+        _idle_connections.clear()
+    for conn in idle:
+        _discard_connection(conn)
+
+# ==================== 单写线程 ====================
+
+class _DbWriter:
+    """
+    单写线程：写操作经有界队列交给一个线程串行执行，
+    DB_WRITE_BATCH_MS 内到达的写操作合并为一个事务（每个操作一个 SAVEPOINT，失败只回滚自身）。
+    读操作仍走连接池；WAL 模式下读不阻塞写。
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, config.DB_WRITE_QUEUE_SIZE))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_path: Optional[str] = None
+
+    def submit(self, fn: Callable[..., Any], args: tuple, timeout: Optional[float] = None) -> Future:
+        """提交写操作；队列满时阻塞（背压），超过 timeout 抛出 queue.Full"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((fn, args, future), timeout=timeout)
+        return future
+
+    def in_writer_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def run_inline(self, fn: Callable[..., Any], args: tuple) -> Any:
+        """在写线程内嵌套写入时直接复用当前事务，避免自己等自己"""
+        return fn(self._connection(), *args)
+
+    def stop(self, timeout: float = 10) -> None:
+        """处理完已排队的写操作后停止线程"""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + max(0, config.DB_WRITE_BATCH_MS) / 1000
+            while len(batch) < max(1, config.DB_WRITE_BATCH_MAX):
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._execute(batch)
+        self._close()
+
+    def _connection(self) -> sqlite3.Connection:
+        # 数据库路径可能在运行中切换（测试、create_app 覆盖配置），此时重新连接
+        path = get_db_path()
+        if self._conn is None or self._conn_path != path:
+            self._close()
+            self._conn = _create_connection()
+            self._conn.isolation_level = None  # 事务由本线程显式控制
+            self._conn_path = path
+        return self._conn
+
+    def _close(self) -> None:
+        if self._conn is not None:
             try:
-                conn.close()
+                self._conn.close()
             except sqlite3.Error:
                 pass
+            self._conn = None
+
+    def _execute(self, batch: list[tuple]) -> None:
+        outcomes = []
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    result = fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"批量写入事务失败（{len(batch)} 个写操作）: {e}")
+            if self._conn is not None:
+                try:
+                    self._conn.rollback()
+                except sqlite3.Error:
+                    pass
+            self._close()
+            # 事务已回滚：已执行的、尚未开始的写操作都以失败结束，调用方不会一直等待
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # 事务提交后再通知调用方，保证调用方返回后能读到写入结果
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_db_writer = _DbWriter()
+
+
+def _write(fn: Callable[..., Any], *args: Any) -> Any:
+    """执行写操作 fn(conn, *args)：默认交给单写线程，关闭时直接使用连接池
+
+    等待超过 DB_WRITE_TIMEOUT 时：还在排队的写操作被取消（写线程跳过，不会再提交）后抛出
+    sqlite3.OperationalError；已经开始执行的写操作无法撤回，再等待一个超时周期取得真实结果，
+    仍未结束才抛出，此时结果未知（该写操作可能随后提交），调用方不应直接重试非幂等写入。
+    """
+    if _db_writer.in_writer_thread():
+        return _db_writer.run_inline(fn, args)
+    if not config.DB_WRITER_ENABLED:
+        with get_connection() as conn:
+            return fn(conn, *args)
+    timeout = max(0.1, config.DB_WRITE_TIMEOUT)
+    try:
+        future = _db_writer.submit(fn, args, timeout=timeout)
+    except queue.Full:
+        raise sqlite3.OperationalError(f"写入队列已满，{timeout:g} 秒内无法提交写操作")
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if future.cancel():
+            raise sqlite3.OperationalError(f"写线程 {timeout:g} 秒内未开始执行写操作，已取消")
+    # 写操作已在执行：返回它所在事务的真实结果，避免调用方以为失败而与数据库状态不一致
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise sqlite3.OperationalError(f"写操作执行超过 {timeout * 2:g} 秒，结果未知（可能随后提交）")
+
+
+def _write_nowait(fn: Callable[..., Any], *args: Any) -> None:
+    """提交写操作但不等待提交结果，与其它写操作合并在同一批事务中；失败只记录日志"""
+    if _db_writer.in_writer_thread() or not config.DB_WRITER_ENABLED:
+        try:
+            _write(fn, *args)
+        except Exception as e:
+            logger.error(f"异步写入失败: {e}")
+        return
+
+    def log_error(future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.error(f"异步写入失败: {error}")
+
+    _db_writer.submit(fn, args).add_done_callback(log_error)
+
+
+def stop_db_writer() -> None:
+    """停止单写线程（进程退出、测试清理时调用）；已排队的写操作会先执行完"""
+    _db_writer.stop()
 
 
 def _has_duplicate_prone_rows(conn: sqlite3.Connection) -> bool:
@@ -159,14 +421,15 @@ def get_db_connection() -> sqlite3.Connection:
 def get_connection():
     """获取数据库连接上下文管理器（使用连接池）"""
     conn = _get_pooled_connection()
+    had_error = False
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        had_error = True
         raise
     finally:
-        _return_connection(conn)
+        _return_connection(conn, had_error)
 
 
 def check_connection():
@@ -195,6 +458,82 @@ def _ensure_source_health_columns(cursor: sqlite3.Cursor) -> None:
             cursor.execute(f"ALTER TABLE sources ADD COLUMN {column_name} {column_definition}")
 
 
+def _ensure_search_cache_table(cursor: sqlite3.Cursor) -> None:
+    """确保搜索结果缓存表存在"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS search_cache (
+        query_key TEXT NOT NULL,
+        sort_by TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        payload BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        last_access REAL NOT NULL,
+        PRIMARY KEY (query_key, sort_by, page)
+    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache(last_access)")
+
+
+def _ensure_keyword_stats_table(cursor: sqlite3.Cursor) -> None:
+    """确保搜索关键词命中统计表存在"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS keyword_stats (
+        anime_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        pattern TEXT NOT NULL,
+        attempts INTEGER DEFAULT 0,
+        accepted INTEGER DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (anime_id, name, pattern),
+        FOREIGN KEY (anime_id) REFERENCES animes(id) ON DELETE CASCADE
+    )''')
+    cursor.execute("PRAGMA table_info(keyword_stats)")
+    existing_columns = {row[1] for row in cursor.fetchall()}
+    column_definitions = {
+        "sources": "INTEGER DEFAULT 0",
+        "best_tier": "TEXT DEFAULT ''",
+        "best_tier_rank": "INTEGER DEFAULT 0",
+        "total_latency_ms": "REAL DEFAULT 0",
+    }
+    for column_name, column_definition in column_definitions.items():
+        if column_name not in existing_columns:
+            cursor.execute(f"ALTER TABLE keyword_stats ADD COLUMN {column_name} {column_definition}")
+
+
+def _ensure_trusted_channel_version(cursor: sqlite3.Cursor) -> None:
+    """确保信任频道版本号表和维护它的触发器存在（应用内外对 trusted_channels 的写入都会递增版本号）"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS trusted_channel_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )''')
+    cursor.execute("INSERT OR IGNORE INTO trusted_channel_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trusted_channels_version_{event.lower()}
+            AFTER {event} ON trusted_channels
+            BEGIN
+                UPDATE trusted_channel_version SET version = version + 1 WHERE id = 1;
+            END''')
+
+
+def _ensure_sync_journal_tables(cursor: sqlite3.Cursor) -> None:
+    """确保同步任务日志表存在（SYNC_TASK_JOURNAL_ENABLED 开启时使用）"""
+    cursor.execute('''CREATE TABLE IF NOT EXISTS sync_task_journal (
+        task_id TEXT PRIMARY KEY,
+        anime_id INTEGER NOT NULL,
+        mode TEXT NOT NULL,
+        sync_type TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS sync_task_progress (
+        task_id TEXT NOT NULL,
+        ep_num INTEGER NOT NULL,
+        PRIMARY KEY (task_id, ep_num),
+        FOREIGN KEY (task_id) REFERENCES sync_task_journal(task_id) ON DELETE CASCADE
+    )''')
+
+
 def init_db(use_migrations: Optional[bool] = None) -> None:
     """初始化数据库，创建所有表
 
@@ -202,7 +541,10 @@ def init_db(use_migrations: Optional[bool] = None) -> None:
         use_migrations: 是否使用 Alembic 迁移，默认 True（测试环境为 False）
     """
     from flask import current_app
-    
+
+    invalidate_trusted_channels()
+    invalidate_settings()
+
     if use_migrations is None:
         use_migrations = current_app.config.get('USE_MIGRATIONS', not getattr(current_app.config, 'TESTING', False))
     
@@ -212,6 +554,10 @@ def init_db(use_migrations: Optional[bool] = None) -> None:
             upgrade_database()
             with get_connection() as conn:
                 _ensure_source_health_columns(conn.cursor())
+                _ensure_search_cache_table(conn.cursor())
+                _ensure_keyword_stats_table(conn.cursor())
+                _ensure_sync_journal_tables(conn.cursor())
+                _ensure_trusted_channel_version(conn.cursor())
             return
         except Exception as e:
             logger.warning(f"迁移执行失败，回退到传统初始化: {e}")
@@ -335,6 +681,14 @@ def init_db(use_migrations: Optional[bool] = None) -> None:
             UNIQUE(title, alias)
         )''')
 
+        # 搜索结果缓存表
+        _ensure_search_cache_table(c)
+
+        # 搜索关键词命中统计表
+        _ensure_keyword_stats_table(c)
+        _ensure_sync_journal_tables(c)
+        _ensure_trusted_channel_version(c)
+
         # 创建索引
         _backup_sqlite_database_for_cleanup(conn)
         c.execute("UPDATE episodes SET absolute_num = 0 WHERE absolute_num IS NULL")
@@ -521,11 +875,12 @@ def update_anime(anime_id: int, data: dict) -> None:
 
 def touch_anime_sync(anime_id: int) -> None:
     """更新动漫最后同步时间"""
-    with get_connection() as conn:
+    def write(conn: sqlite3.Connection) -> None:
         conn.execute(
             "UPDATE animes SET last_sync_at = CURRENT_TIMESTAMP WHERE id = ?",
             (anime_id,)
         )
+    _write(write)
 
 
 def delete_anime(anime_id: int) -> None:
@@ -733,7 +1088,7 @@ def get_source(source_id: int) -> Optional[dict]:
 
 def update_source_health(source_id: int, status: str, error_message: str = '', fail_threshold: int = 2) -> Optional[dict]:
     """更新视频源健康状态"""
-    with get_connection() as conn:
+    def write(conn: sqlite3.Connection) -> Optional[dict]:
         row = conn.execute(
             "SELECT fail_count FROM sources WHERE id = ?",
             (source_id,)
@@ -761,6 +1116,7 @@ def update_source_health(source_id: int, status: str, error_message: str = '', f
         )
         updated = conn.execute("SELECT * FROM sources WHERE id = ?", (source_id,)).fetchone()
         return dict(updated) if updated else None
+    return _write(write)
 
 
 def delete_sources_for_episode(episode_id: int) -> int:
@@ -787,6 +1143,77 @@ def get_episode_source_counts(anime_id: int) -> dict[int, int]:
         return {row["id"]: row["source_count"] for row in rows}
 
 
+def get_episode_ids_without_sources(anime_id: int) -> set[int]:
+    """获取动漫中没有任何有效视频源的集数 ID（单次聚合查询）"""
+    with get_connection() as conn:
+        rows = conn.execute(
+            """SELECT e.id FROM episodes e
+               WHERE e.anime_id = ?
+                 AND NOT EXISTS (
+                     SELECT 1 FROM sources s WHERE s.episode_id = e.id AND s.is_valid = 1
+                 )""",
+            (anime_id,)
+        ).fetchall()
+        return {row["id"] for row in rows}
+
+
+def get_library_sync_plan(today: str) -> dict[int, dict]:
+    """
+    全库同步计划（单次聚合查询）：每部动漫已开播但没有有效视频源的集数、
+    最近一集和下一集的开播日期，以及距上次同步的小时数（从未同步为 None）
+
+    Returns:
+        {anime_id: {"missing_count": int, "latest_air_date": str, "next_air_date": str,
+                    "hours_since_sync": Optional[float]}}
+    """
+    with get_connection() as conn:
+        rows = conn.execute(
+            """SELECT a.id,
+                COUNT(CASE
+                    WHEN (a.tmdb_id IS NULL OR (e.air_date != '' AND e.air_date <= ?))
+                         AND NOT EXISTS (
+                             SELECT 1 FROM sources s WHERE s.episode_id = e.id AND s.is_valid = 1
+                         ) THEN e.id
+                END) AS missing_count,
+                COALESCE(MAX(CASE WHEN e.air_date != '' AND e.air_date <= ? THEN e.air_date END), '')
+                    AS latest_air_date,
+                COALESCE(MIN(CASE WHEN e.air_date > ? THEN e.air_date END), '') AS next_air_date,
+                (julianday('now') - julianday(a.last_sync_at)) * 24 AS hours_since_sync
+            FROM animes a
+            LEFT JOIN episodes e ON a.id = e.anime_id
+            GROUP BY a.id""",
+            (today, today, today)
+        ).fetchall()
+        return {
+            row["id"]: {
+                "missing_count": row["missing_count"],
+                "latest_air_date": row["latest_air_date"],
+                "next_air_date": row["next_air_date"],
+                "hours_since_sync": row["hours_since_sync"],
+            }
+            for row in rows
+        }
+
+
+def get_recent_air_dates(today: str, per_anime: int = 6) -> dict[int, list[str]]:
+    """每部动漫最近已开播的若干集开播日期（降序，去重），用于推算播出周期"""
+    with get_connection() as conn:
+        rows = conn.execute(
+            """SELECT anime_id, air_date FROM (
+                   SELECT anime_id, air_date,
+                          ROW_NUMBER() OVER (PARTITION BY anime_id ORDER BY air_date DESC) AS rank
+                   FROM (SELECT DISTINCT anime_id, air_date FROM episodes
+                         WHERE air_date != '' AND air_date <= ?)
+               ) WHERE rank <= ?
+               ORDER BY anime_id, air_date DESC""",
+            (today, per_anime)
+        ).fetchall()
+        air_dates: dict[int, list[str]] = {}
+        for row in rows:
+            air_dates.setdefault(row["anime_id"], []).append(row["air_date"])
+        return air_dates
+
+
 def add_source(data: dict) -> int:
     """添加视频源"""
     with get_connection() as conn:
@@ -816,6 +1243,52 @@ def add_source(data: dict) -> int:
         return row["id"]
 
 
+_SOURCE_INSERT_COLUMNS = (
+    "episode_id", "video_id", "title", "channel_id", "channel_name",
+    "duration", "view_count", "published_at", "match_score",
+)
+
+
+def replace_episode_sources(episode_id: int, sources: list[dict], force: bool = False) -> list[dict]:
+    """在一个事务内批量保存某集的视频源
+
+    force 时先删除该集全部旧视频源；新视频源用一条多行 INSERT ... RETURNING 写入，
+    直接返回写入的行，不再逐条查询 id 或事后回读。
+
+    Args:
+        episode_id: 集数 ID
+        sources: 视频源记录（字段同 add_source），已按优先级排列
+        force: 是否先清空该集旧视频源
+
+    Returns:
+        本次写入的有效视频源（按 match_score 降序）
+    """
+    defaults = {"title": "", "channel_id": "", "channel_name": "", "duration": 0,
+                "view_count": 0, "published_at": "", "match_score": 0}
+    params = []
+    for data in sources:
+        record = {**defaults, **data, "episode_id": episode_id}
+        params.extend(record[column] for column in _SOURCE_INSERT_COLUMNS)
+
+    def write(conn: sqlite3.Connection) -> list[sqlite3.Row]:
+        if force:
+            deleted = conn.execute("DELETE FROM sources WHERE episode_id = ?", (episode_id,)).rowcount
+            logger.info(f"强制搜索清理旧视频源: episode_id={episode_id} ({deleted}个)")
+        if not sources:
+            return []
+        placeholders = ", ".join(["(" + ", ".join("?" * len(_SOURCE_INSERT_COLUMNS)) + ")"] * len(sources))
+        return conn.execute(
+            f"""INSERT OR IGNORE INTO sources ({", ".join(_SOURCE_INSERT_COLUMNS)})
+                VALUES {placeholders}
+                RETURNING *""",
+            params
+        ).fetchall()
+
+    saved = [dict(row) for row in _write(write) if row["is_valid"]]
+    saved.sort(key=lambda row: row["match_score"], reverse=True)
+    return saved
+
+
 # ==================== 别名 CRUD ====================
 
 def get_aliases(anime_id: int) -> list[str]:
@@ -874,29 +1347,89 @@ def set_source_rules(anime_id: int, rules: dict) -> None:
 
 # ==================== 设置 ====================
 
+def _get_settings_snapshot() -> dict[str, str]:
+    """返回设置快照；首次调用、失效或超过 TTL 后从数据库重新加载，并通知发生变化的键"""
+    global _settings_snapshot, _settings_loaded_at, _settings_version
+    snapshot = _settings_snapshot
+    if snapshot is not None and time.monotonic() - _settings_loaded_at < config.SETTINGS_CACHE_TTL:
+        return snapshot
+    changed: set[str] = set()
+    with _settings_lock:
+        if (
+            _settings_snapshot is None
+            or time.monotonic() - _settings_loaded_at >= config.SETTINGS_CACHE_TTL
+        ):
+            with get_connection() as conn:
+                rows = conn.execute("SELECT key, value FROM settings").fetchall()
+            fresh = {row["key"]: row["value"] for row in rows}
+            previous = _settings_snapshot or {}
+            changed = {key for key in fresh.keys() | previous.keys() if fresh.get(key) != previous.get(key)}
+            if changed:
+                _settings_version += 1
+            _settings_snapshot = fresh
+            _settings_loaded_at = time.monotonic()
+        snapshot = _settings_snapshot
+    if changed:
+        _notify_settings_listeners(changed)
+    return snapshot
+
+
+def _notify_settings_listeners(keys: set[str]) -> None:
+    for listener in list(_settings_listeners):
+        try:
+            listener(keys)
+        except Exception as e:
+            logger.warning(f"设置变更通知处理失败: {e}")
+
+
 def get_all_settings() -> dict[str, str]:
     """获取所有设置"""
-    with get_connection() as conn:
-        rows = conn.execute("SELECT key, value FROM settings").fetchall()
-        return {row["key"]: row["value"] for row in rows}
+    return dict(_get_settings_snapshot())
 
 
 def get_setting(key: str, default: str = "") -> str:
     """获取单个设置"""
-    with get_connection() as conn:
-        row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
-        return row["value"] if row else default
+    return _get_settings_snapshot().get(key, default)
 
 
 def set_setting(key: str, value: str) -> None:
     """设置/更新单个设置"""
-    with get_connection() as conn:
-        conn.execute(
-            """INSERT INTO settings (key, value) VALUES (?, ?)
-               ON CONFLICT(key) DO UPDATE SET value = excluded.value,
-               updated_at = CURRENT_TIMESTAMP""",
-            (key, value)
-        )
+    global _settings_snapshot, _settings_version
+    # 写库与更新快照在同一把锁内完成，保证并发写入时快照与数据库顺序一致
+    with _settings_lock:
+        with get_connection() as conn:
+            conn.execute(
+                """INSERT INTO settings (key, value) VALUES (?, ?)
+                   ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                   updated_at = CURRENT_TIMESTAMP""",
+                (key, value)
+            )
+        changed = _settings_snapshot is None or _settings_snapshot.get(key) != value
+        if _settings_snapshot is not None and changed:
+            _settings_snapshot = {**_settings_snapshot, key: value}
+        if changed:
+            _settings_version += 1
+    if changed:
+        _notify_settings_listeners({key})
+
+
+def get_settings_version() -> int:
+    """设置快照版本号，每次设置发生变化时递增（同时触发快照的 TTL 兜底重载）"""
+    _get_settings_snapshot()
+    return _settings_version
+
+
+def add_settings_listener(listener: Callable[[set[str]], None]) -> None:
+    """注册设置变更监听者，回调参数为发生变化的键集合"""
+    if listener not in _settings_listeners:
+        _settings_listeners.append(listener)
+
+
+def invalidate_settings() -> None:
+    """使设置快照在下次读取时重新加载（保留旧快照用于比对变化）"""
+    global _settings_loaded_at
+    with _settings_lock:
+        _settings_loaded_at = float("-inf")
 
 
 # ==================== 同步日志 ====================
@@ -904,12 +1437,13 @@ def set_setting(key: str, value: str) -> None:
 def add_sync_log(anime_id: int, sync_type: str, episodes_synced: int,
                  sources_found: int, status: str = "success", message: str = "") -> None:
     """添加同步日志"""
-    with get_connection() as conn:
+    def write(conn: sqlite3.Connection) -> None:
         conn.execute(
             """INSERT INTO sync_logs (anime_id, sync_type, episodes_synced, sources_found, status, message)
                VALUES (?, ?, ?, ?, ?, ?)""",
             (anime_id, sync_type, episodes_synced, sources_found, status, message)
         )
+    _write(write)
 
 
 def get_sync_logs(anime_id: Optional[int] = None, limit: int = 20) -> list[dict]:
@@ -937,6 +1471,205 @@ def cleanup_old_sync_logs(days: int = 90) -> None:
         )
 
 
+# ==================== 搜索结果缓存 ====================
+
+def get_search_cache(query_key: str, sort_by: str, page: int) -> Optional[bytes]:
+    """读取未过期的搜索结果缓存
+
+    命中时最近访问时间按 SEARCH_CACHE_TOUCH_SECONDS 精度交给写线程异步刷新，
+    读路径不占用 SQLite 写锁。
+    """
+    now = time.time()
+    with get_connection() as conn:
+        row = conn.execute(
+            """SELECT payload, last_access FROM search_cache
+               WHERE query_key = ? AND sort_by = ? AND page = ? AND expires_at > ?""",
+            (query_key, sort_by, page, now)
+        ).fetchone()
+    if row is None:
+        return None
+    if now - (row["last_access"] or 0) >= config.SEARCH_CACHE_TOUCH_SECONDS:
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "UPDATE search_cache SET last_access = ? WHERE query_key = ? AND sort_by = ? AND page = ?",
+                (now, query_key, sort_by, page)
+            )
+        _write_nowait(write)
+    return row["payload"]
+
+
+def set_search_cache(query_key: str, sort_by: str, page: int, payload: bytes, ttl: int) -> None:
+    """写入/覆盖搜索结果缓存"""
+    now = time.time()
+
+    def write(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """INSERT INTO search_cache
+               (query_key, sort_by, page, payload, size, created_at, expires_at, last_access)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(query_key, sort_by, page) DO UPDATE SET
+               payload = excluded.payload, size = excluded.size, created_at = excluded.created_at,
+               expires_at = excluded.expires_at, last_access = excluded.last_access""",
+            (query_key, sort_by, page, payload, len(payload), now, now + ttl, now)
+        )
+    _write(write)
+
+
+def prune_search_cache(max_entries: int, max_bytes: int) -> int:
+    """清理过期缓存，并按最近访问时间淘汰超出条数/容量上限的旧条目
+
+    Returns:
+        删除的条目数
+    """
+    def write(conn: sqlite3.Connection) -> int:
+        deleted = conn.execute(
+            "DELETE FROM search_cache WHERE expires_at <= ?",
+            (time.time(),)
+        ).rowcount
+        deleted += conn.execute(
+            """DELETE FROM search_cache WHERE rowid IN (
+                   SELECT rowid FROM (
+                       SELECT rowid,
+                              ROW_NUMBER() OVER (ORDER BY last_access DESC) AS rank,
+                              SUM(size) OVER (ORDER BY last_access DESC) AS total_size
+                       FROM search_cache
+                   ) WHERE rank > ? OR total_size > ?
+               )""",
+            (max_entries, max_bytes)
+        ).rowcount
+        return deleted
+    return _write(write)
+
+
+# ==================== 关键词命中统计 ====================
+
+def get_keyword_stats(anime_id: int) -> dict[tuple[str, str], dict]:
+    """获取动漫各 (名称, 关键词模式) 的搜索次数、命中次数及距上次搜索的天数"""
+    with get_connection() as conn:
+        rows = conn.execute(
+            """SELECT name, pattern, attempts, accepted,
+                      julianday('now') - julianday(updated_at) AS age_days
+               FROM keyword_stats WHERE anime_id = ?""",
+            (anime_id,)
+        ).fetchall()
+        return {(row["name"], row["pattern"]): dict(row) for row in rows}
+
+
+def list_keyword_stats(anime_id: Optional[int] = None, limit: int = 200) -> list[dict]:
+    """获取关键词命中统计（诊断用），按命中率升序，最浪费配额的排在前面"""
+    query = """SELECT k.anime_id, a.title_cn, k.name, k.pattern, k.attempts, k.accepted,
+                      k.sources, k.best_tier, k.updated_at,
+                      ROUND(CAST(k.accepted AS REAL) / MAX(k.attempts, 1), 3) AS hit_rate,
+                      ROUND(k.total_latency_ms / MAX(k.attempts, 1), 1) AS avg_latency_ms
+               FROM keyword_stats k
+               JOIN animes a ON a.id = k.anime_id"""
+    params: list = []
+    if anime_id is not None:
+        query += " WHERE k.anime_id = ?"
+        params.append(anime_id)
+    query += " ORDER BY hit_rate ASC, k.attempts DESC LIMIT ?"
+    params.append(limit)
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+
+def record_keyword_results(anime_id: int, results: list[dict]) -> None:
+    """批量记录一次搜索中各关键词的产出
+
+    Args:
+        anime_id: 动漫 ID
+        results: 每个关键词一条，包含 name、pattern、sources（被采纳的视频源数）、
+                 best_tier / best_tier_rank（通过评分的最高置信等级）、latency_ms（搜索耗时）
+    """
+    if not results:
+        return
+
+    def write(conn: sqlite3.Connection) -> None:
+        conn.executemany(
+            """INSERT INTO keyword_stats
+                   (anime_id, name, pattern, attempts, accepted, sources,
+                    best_tier, best_tier_rank, total_latency_ms)
+               VALUES (:anime_id, :name, :pattern, 1, :sources > 0, :sources,
+                       :best_tier, :best_tier_rank, :latency_ms)
+               ON CONFLICT(anime_id, name, pattern) DO UPDATE SET
+               attempts = attempts + 1,
+               accepted = accepted + excluded.accepted,
+               sources = sources + excluded.sources,
+               best_tier = CASE WHEN excluded.best_tier_rank > best_tier_rank
+                                THEN excluded.best_tier ELSE best_tier END,
+               best_tier_rank = MAX(best_tier_rank, excluded.best_tier_rank),
+               total_latency_ms = total_latency_ms + excluded.total_latency_ms,
+               updated_at = CURRENT_TIMESTAMP""",
+            [{**item, "anime_id": anime_id} for item in results]
+        )
+    _write(write)
+
+
+# ==================== 同步任务日志 ====================
+
+def journal_sync_task(task_id: str, anime_id: int, mode: str, sync_type: str, priority: int) -> None:
+    """记录入队的同步任务；同一任务再次记录（提升优先级）时只更新优先级"""
+    def write(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """INSERT INTO sync_task_journal (task_id, anime_id, mode, sync_type, priority)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(task_id) DO UPDATE SET
+               priority = excluded.priority,
+               updated_at = CURRENT_TIMESTAMP""",
+            (task_id, anime_id, mode, sync_type, priority)
+        )
+    _write_nowait(write)
+
+
+def journal_sync_task_status(task_id: str, status: str) -> None:
+    """更新同步任务状态（queued / running）"""
+    def write(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "UPDATE sync_task_journal SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE task_id = ?",
+            (status, task_id)
+        )
+    _write_nowait(write)
+
+
+def journal_sync_episode(task_id: str, ep_num: int) -> None:
+    """记录同步任务已完成的一集（断点）"""
+    def write(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """INSERT OR IGNORE INTO sync_task_progress (task_id, ep_num)
+               SELECT task_id, ? FROM sync_task_journal WHERE task_id = ?""",
+            (ep_num, task_id)
+        )
+    _write_nowait(write)
+
+
+def finish_journal_sync_task(task_id: str) -> None:
+    """任务结束后删除其日志和断点"""
+    def write(conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM sync_task_progress WHERE task_id = ?", (task_id,))
+        conn.execute("DELETE FROM sync_task_journal WHERE task_id = ?", (task_id,))
+    _write_nowait(write)
+
+
+def get_interrupted_sync_tasks() -> list[dict]:
+    """获取上次运行未结束的同步任务（按入队顺序），completed_eps 为已完成的集数"""
+    with get_connection() as conn:
+        rows = conn.execute(
+            """SELECT j.*, json_group_array(p.ep_num) FILTER (WHERE p.ep_num IS NOT NULL) AS completed_eps
+               FROM sync_task_journal j
+               JOIN animes a ON a.id = j.anime_id
+               LEFT JOIN sync_task_progress p ON p.task_id = j.task_id
+               GROUP BY j.task_id
+               ORDER BY j.created_at, j.rowid"""
+        ).fetchall()
+        tasks = []
+        for row in rows:
+            task = dict(row)
+            task["completed_eps"] = set(json.loads(task["completed_eps"] or "[]"))
+            tasks.append(task)
+        return tasks
+
+
 # ==================== 信任频道 ====================
 
 def get_trusted_channels() -> list[dict]:
@@ -949,13 +1682,41 @@ def get_trusted_channels() -> list[dict]:
 
 
 def is_trusted_channel(channel_id: str) -> bool:
-    """检查是否为信任频道"""
+    """检查是否为信任频道（查内存索引，不访问数据库）"""
+    return channel_id in get_trusted_channel_ids()
+
+
+def get_trusted_channel_version() -> int:
+    """信任频道版本号，trusted_channels 每次写入（含外部直接改库）都会递增"""
     with get_connection() as conn:
-        row = conn.execute(
-            "SELECT id FROM trusted_channels WHERE channel_id = ?",
-            (channel_id,)
-        ).fetchone()
-        return row is not None
+        row = conn.execute("SELECT version FROM trusted_channel_version WHERE id = 1").fetchone()
+    return row["version"] if row else 0
+
+
+def get_trusted_channel_ids() -> frozenset[str]:
+    """获取信任频道 ID 集合；只查一次版本号，版本号变化（或首次调用）时才重新加载整表
+
+    同步时每部动漫调用一次，评分时逐个视频的判断都查这个集合，不再访问数据库。
+    """
+    global _trusted_channel_ids, _trusted_channel_version
+    version = get_trusted_channel_version()
+    ids = _trusted_channel_ids
+    if ids is not None and version == _trusted_channel_version:
+        return ids
+    with _trusted_channel_lock:
+        if _trusted_channel_ids is None or version != _trusted_channel_version:
+            with get_connection() as conn:
+                rows = conn.execute("SELECT channel_id FROM trusted_channels").fetchall()
+            _trusted_channel_ids = frozenset(row["channel_id"] for row in rows)
+            _trusted_channel_version = version
+        return _trusted_channel_ids
+
+
+def invalidate_trusted_channels() -> None:
+    """使信任频道索引失效，下次读取时重新加载（切换数据库时调用）"""
+    global _trusted_channel_ids
+    with _trusted_channel_lock:
+        _trusted_channel_ids = None
 
 
 # ==================== 全局别名 ====================
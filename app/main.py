@@ -118,6 +118,7 @@ def create_app(test_config: dict = None) -> Flask:
             from app.core.sync_queue import sync_queue
             from app.core.scheduler import start_scheduler
             sync_queue.start()
+            sync_queue.resume_journal()
             start_scheduler()
         except Exception as e:
             logger.error(f"调度器启动失败: {e}")